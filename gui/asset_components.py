@@ -6,7 +6,7 @@ import gradio as gr
 
 from shortGPT.api_utils.eleven_api import ElevenLabsAPI
 from shortGPT.config.api_db import ApiKeyManager
-from shortGPT.config.asset_db import AssetDatabase
+from shortGPT.config.asset_db import AssetDatabase, AssetType
 
 
 class AssetComponentsUtils:
@@ -82,14 +82,12 @@ class AssetComponentsUtils:
 
     @classmethod
     def getBackgroundVideoChoices(cls):
-        df = AssetDatabase.get_df()
-        choices = list(df.loc["background video" == df["type"]]["name"])[:20]
+        choices = AssetDatabase.get_asset_names(AssetType.BACKGROUND_VIDEO)[:20]
         return choices
 
     @classmethod
     def getBackgroundMusicChoices(cls):
-        df = AssetDatabase.get_df()
-        choices = list(df.loc["background music" == df["type"]]["name"])[:20]
+        choices = AssetDatabase.get_asset_names(AssetType.BACKGROUND_MUSIC)[:20]
         return choices
 
     @classmethod
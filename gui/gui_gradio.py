@@ -1,3 +1,5 @@
+import threading
+
 import gradio as gr
 
 from gui.content_automation_ui import GradioContentAutomationUI
@@ -5,6 +7,8 @@ from gui.ui_abstract_base import AbstractBaseUI
 from gui.ui_components_html import GradioComponentsHTML
 from gui.ui_tab_asset_library import AssetLibrary
 from gui.ui_tab_config import ConfigUI
+from shortGPT.audio.whisper_model_pool import (WHISPER_MODEL_POOL,
+                                               WHISPER_PRELOAD_MODELS)
 from shortGPT.utils.cli import CLI
 
 
@@ -29,6 +33,9 @@ class ShortGptUI(AbstractBaseUI):
 
     def launch(self):
         '''Launch the server'''
+        if WHISPER_PRELOAD_MODELS:
+            # Loaded while the server starts, so the first job does not wait for the models
+            threading.Thread(target=WHISPER_MODEL_POOL.preload, args=(WHISPER_PRELOAD_MODELS,), daemon=True).start()
         shortGptUI = self.create_interface()
         shortGptUI.queue(concurrency_count=5, max_size=20).launch(server_port=31415, height=1000, share=self.colab, server_name="0.0.0.0")
 
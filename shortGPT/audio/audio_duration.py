@@ -1,46 +1,20 @@
-import json
-import subprocess
-
-import yt_dlp
-
 from shortGPT.editing_utils.handle_videos import getYoutubeVideoLink
+from shortGPT.editing_utils.media_probe import get_media_info
+from shortGPT.editing_utils.youtube_resolver import YOUTUBE_RESOLVER
 
 
 def get_duration_yt_dlp(url):
-    ydl_opts = {
-        "quiet": True,
-        "no_warnings": True,
-        "no_color": True,
-        "no_call_home": True,
-        "no_check_certificate": True
-    }
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            dictMeta = ydl.extract_info(url, download=False, )
-            return dictMeta['duration'], ""
+        return YOUTUBE_RESOLVER.get_duration(url), ""
     except Exception as e:
         return None, f"Failed getting duration from the following video/audio url/path using yt_dlp. {e.args[0]}"
 
 
 def get_duration_ffprobe(signed_url):
     try:
-        cmd = [
-            "ffprobe",
-            "-v",
-            "quiet",
-            "-print_format",
-            "json",
-            "-show_format",
-            "-i",
-            signed_url
-        ]
-        output = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-        if output.returncode != 0:
-            return None, f"Error executing command using ffprobe. {output.stderr.strip()}"
-
-        metadata = json.loads(output.stdout)
-        duration = float(metadata["format"]["duration"])
+        duration = get_media_info(signed_url)['duration']
+        if duration is None:
+            return None, "Error getting the duration using ffprobe. The container has no duration"
         return duration, ""
     except Exception as e:
         print("Failed getting the duration of the asked ressource", e.args[0])
@@ -68,20 +42,8 @@ def get_asset_duration(url, isVideo=True):
 
 
 def getYoutubeAudioLink(url):
-    ydl_opts = {
-        "quiet": True,
-        "no_warnings": True,
-        "no_color": True,
-        "no_call_home": True,
-        "no_check_certificate": True,
-        "format": "bestaudio/best"
-    }
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            dictMeta = ydl.extract_info(
-                url,
-                download=False)
-            return dictMeta['url'], dictMeta['duration']
+        return YOUTUBE_RESOLVER.resolve(url, "bestaudio/best")
     except Exception as e:
         print("Failed getting audio link from the following video/url", e.args[0])
     return None
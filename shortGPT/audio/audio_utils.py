@@ -4,11 +4,11 @@ import subprocess
 import yt_dlp
 
 from shortGPT.audio.audio_duration import get_asset_duration
+from shortGPT.audio.transcribers import TranscriberBackend, get_transcriber
+from shortGPT.audio.transcription_cache import TRANSCRIPTION_CACHE
 
 CONST_CHARS_PER_SEC = 20.5  # Arrived to this result after whispering a ton of shorts and calculating the average number of characters per second of speech.
 
-WHISPER_MODEL = None
-
 
 def downloadYoutubeAudio(url, outputFile):
     ydl_opts = {
@@ -61,12 +61,11 @@ def ChunkForAudio(alltext, chunk_size=2500):
     return chunks
 
 
-def audioToText(filename, model_size="base"):
-    from whisper_timestamped import load_model, transcribe_timestamped
-    global WHISPER_MODEL
-    if (WHISPER_MODEL == None):
-        WHISPER_MODEL = load_model(model_size)
-    gen = transcribe_timestamped(WHISPER_MODEL, filename, verbose=False, fp16=False)
+def audioToText(filename, model_size="base", backend: TranscriberBackend = TranscriberBackend.WHISPER_TIMESTAMPED, use_cache=True):
+    transcriber = get_transcriber(backend)
+    if not use_cache:
+        return transcriber.transcribe(filename, model_size=model_size)
+    gen = TRANSCRIPTION_CACHE.transcribe(transcriber, backend, filename, model_size=model_size)
     return gen
 
 
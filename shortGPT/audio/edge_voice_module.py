@@ -8,11 +8,22 @@ from shortGPT.audio.voice_module import VoiceModule
 from shortGPT.config.languages import (EDGE_TTS_VOICENAME_MAPPING,
                                        LANGUAGE_ACRONYM_MAPPING, Language)
 
+# WordBoundary offsets and durations are in 100 nanosecond ticks
+EDGE_TICKS_PER_SECOND = 10_000_000
+
 
 def run_async_func(loop, func):
     return loop.run_until_complete(func)
 
 
+def get_word_boundary_communicate(text, voiceName):
+    # edge_tts 7 streams sentence boundaries by default, earlier versions only stream word boundaries
+    try:
+        return edge_tts.Communicate(text, voiceName, boundary="WordBoundary")
+    except TypeError:
+        return edge_tts.Communicate(text, voiceName)
+
+
 class EdgeTTSVoiceModule(VoiceModule):
     def __init__(self, voiceName):
         self.voiceName = voiceName
@@ -25,27 +36,36 @@ class EdgeTTSVoiceModule(VoiceModule):
         return 999999999999
 
     def generate_voice(self, text, outputfile):
+        return self.generate_voice_with_alignment(text, outputfile)[0]
+
+    def generate_voice_with_alignment(self, text, outputfile):
+        word_alignment = []
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
         try:
             with ThreadPoolExecutor() as executor:
-                loop.run_in_executor(executor, run_async_func, loop, self.async_generate_voice(text, outputfile))
+                loop.run_in_executor(executor, run_async_func, loop, self.async_generate_voice(text, outputfile, word_alignment))
 
         finally:
             loop.close()
         if not os.path.exists(outputfile):
             print("An error happened during edge_tts audio generation, no output audio generated")
             raise Exception("An error happened during edge_tts audio generation, no output audio generated")
-        return outputfile
+        return outputfile, word_alignment or None
 
-    async def async_generate_voice(self, text, outputfile):
+    async def async_generate_voice(self, text, outputfile, word_alignment=None):
         try:
-            communicate = edge_tts.Communicate(text, self.voiceName)
+            communicate = get_word_boundary_communicate(text, self.voiceName)
             with open(outputfile, "wb") as file:
                 async for chunk in communicate.stream():
                     if chunk["type"] == "audio":
                         file.write(chunk["data"])
+                    elif chunk["type"] == "WordBoundary" and word_alignment is not None:
+                        start = chunk["offset"] / EDGE_TICKS_PER_SECOND
+                        word_alignment.append({'text': chunk["text"],
+                                               'start': start,
+                                               'end': start + chunk["duration"] / EDGE_TICKS_PER_SECOND})
         except Exception as e:
             print("Error generating audio using edge_tts", e)
             raise Exception("An error happened during edge_tts audio generation, no output audio generated", e)
@@ -0,0 +1,279 @@
+import math
+import re
+import subprocess
+
+import numpy as np
+
+from shortGPT.audio.word_alignment import alignment_to_whisper_analysis
+
+SAMPLE_RATE = 16000
+FRAME_DURATION = 0.02
+# Voiced runs shorter than this are clicks rather than words
+MIN_RUN_FRAMES = 2
+# Most words a single voiced run can hold, and most voiced runs a single word can span, like a word split by its stops
+MAX_GROUP_WORDS = 40
+MAX_WORD_RUNS = 3
+# Prior spread of the log ratio between the spoken duration of words and the duration expected from their letters
+PRIOR_DURATION_SPREAD = 0.35
+PRIOR_WEIGHT = 5
+# Cost of a silence inside a word, plus a cost per second of it, of a word boundary without a silence, like in fluent
+# speech, and more when the word ends with a punctuation mark
+SILENCE_IN_WORD_COST = 4
+SILENCE_IN_WORD_COST_PER_SECOND = 10
+NO_SILENCE_BETWEEN_WORDS_COST = 2
+MISSING_PAUSE_COST = 1
+PAUSE_PUNCTUATION = ('.', '!', '?', ',', ';', ':')
+# Voiced runs that can be left out of the alignment, like breaths, and the cost of leaving one out
+MAX_SKIPPED_RUN = 0.2
+SKIPPED_RUN_COST = 3
+# Runs considered for a word are the ones within this many seconds of its position if the script was spoken at a constant rate
+SEARCH_WINDOW = 10
+# Alignments whose expected word boundary error in seconds is larger are not used
+MAX_EXPECTED_ERROR = 0.07
+# Scripts whose words are this long on average are not split by spaces, like Chinese or Japanese
+MAX_AVERAGE_WORD_LENGTH = 20
+
+
+def load_audio_samples(audio_path, sample_rate=SAMPLE_RATE):
+    '''Mono float samples of any audio or video file, decoded by ffmpeg'''
+    output = subprocess.run(['ffmpeg', '-v', 'error', '-i', audio_path, '-ac', '1', '-ar', str(sample_rate), '-f', 's16le', '-'],
+                            capture_output=True, check=True).stdout
+    return np.frombuffer(output, dtype=np.int16).astype(np.float32) / 32768
+
+
+def get_voiced_probability(samples, sample_rate=SAMPLE_RATE, frame_duration=FRAME_DURATION):
+    '''Probability that each frame is speech, from its energy between the noise floor and the speech level of the file'''
+    frame_size = int(sample_rate * frame_duration)
+    frame_count = len(samples) // frame_size
+    if not frame_count:
+        return np.zeros(0)
+    frames = samples[:frame_count * frame_size].reshape(frame_count, frame_size)
+    energy = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    noise_floor, speech_level = np.percentile(energy, 10), np.percentile(energy, 90)
+    if speech_level - noise_floor < 6:
+        return np.ones(frame_count) if speech_level > -50 else np.zeros(frame_count)
+    threshold = (noise_floor + speech_level) / 2
+    return 1 / (1 + np.exp(-(energy - threshold) / ((speech_level - noise_floor) / 8)))
+
+
+def get_voiced_runs(voiced_probability):
+    '''(start, end) seconds of the runs of consecutive voiced frames'''
+    voiced = np.concatenate([[False], voiced_probability > 0.5, [False]])
+    changes = np.flatnonzero(voiced[1:] != voiced[:-1])
+    return [(start * FRAME_DURATION, end * FRAME_DURATION) for start, end in zip(changes[::2], changes[1::2])
+            if end - start >= MIN_RUN_FRAMES]
+
+
+class GroupAlignment:
+    '''
+    Aligns words to voiced runs in groups: one or several words spoken in one run, one word spoken over a few runs,
+    or a short run that is not a word. The groups are chosen by dynamic programming on how well the voiced duration
+    of the runs fits the letters of the words, and on where the silences fall.
+    '''
+
+    def __init__(self, words, runs):
+        self.words = words
+        self.runs = runs
+        self.letters = np.concatenate([[0], np.cumsum([max(len(re.sub(r'\W', '', word)), 1) for word in words])])
+        self.voiced = np.concatenate([[0], np.cumsum([end - start for start, end in runs])])
+        self.seconds_per_letter = self.voiced[-1] / self.letters[-1]
+        self.voiced_per_second = self.voiced[-1] / runs[-1][1]
+        self.pauses = np.concatenate([[0], np.cumsum([word[-1] in PAUSE_PUNCTUATION for word in words])])
+
+    def get_log_ratio(self, word_start, word_end, run_start, run_end):
+        '''Log ratio of the voiced duration of the runs to the duration expected from the letters of the words'''
+        voiced_duration = self.voiced[run_end] - self.voiced[run_start]
+        return math.log(voiced_duration / (self.seconds_per_letter * (self.letters[word_end] - self.letters[word_start])))
+
+    def get_group_cost(self, word_start, word_end, run_start, run_end):
+        word_count, run_count = word_end - word_start, run_end - run_start
+        log_ratio = self.get_log_ratio(word_start, word_end, run_start, run_end)
+        cost = word_count * log_ratio ** 2 / (2 * PRIOR_DURATION_SPREAD ** 2)
+        if run_count > 1:
+            silences = self.runs[run_end - 1][1] - self.runs[run_start][0] - (self.voiced[run_end] - self.voiced[run_start])
+            cost += SILENCE_IN_WORD_COST * (run_count - 1) + SILENCE_IN_WORD_COST_PER_SECOND * silences
+        if word_count > 1:
+            missing_pauses = self.pauses[word_end - 1] - self.pauses[word_start]
+            cost += NO_SILENCE_BETWEEN_WORDS_COST * (word_count - 1) + MISSING_PAUSE_COST * missing_pauses
+        return cost
+
+    def get_next_groups(self, word_start, run_start):
+        '''Groups that can start at a word and run, as (word_end, run_end, cost)'''
+        word_count, run_count = len(self.words), len(self.runs)
+        if self.runs[run_start][1] - self.runs[run_start][0] <= MAX_SKIPPED_RUN:
+            yield word_start, run_start + 1, SKIPPED_RUN_COST
+        if word_start == word_count:
+            return
+        for run_end in range(run_start + 2, min(run_start + MAX_WORD_RUNS, run_count) + 1):
+            yield word_start + 1, run_end, self.get_group_cost(word_start, word_start + 1, run_start, run_end)
+        run_duration = self.voiced[run_start + 1] - self.voiced[run_start]
+        for word_end in range(word_start + 1, min(word_start + MAX_GROUP_WORDS, word_count) + 1):
+            yield word_end, run_start + 1, self.get_group_cost(word_start, word_end, run_start, run_start + 1)
+            # Groups with many more letters than the run can hold are not worth trying
+            if self.seconds_per_letter * (self.letters[word_end] - self.letters[word_start]) > 4 * run_duration:
+                break
+
+    def get_start_runs(self, word_index):
+        '''Runs a group starting at a word is tried from, around its position if the script was spoken at a constant rate'''
+        voiced_position = self.voiced[-1] * self.letters[word_index] / self.letters[-1]
+        window = SEARCH_WINDOW * self.voiced_per_second
+        first_run = int(np.searchsorted(self.voiced, voiced_position - window)) - 1
+        last_run = int(np.searchsorted(self.voiced, voiced_position + window)) + 1
+        return range(max(first_run, 0), min(last_run, len(self.runs) - 1) + 1)
+
+    def align(self):
+        '''
+        Returns the groups of the lowest cost alignment as (word_start, word_end, run_start, run_end), or None if no
+        alignment fits. The costs are negative log likelihoods, and the log likelihood of all the alignments reaching
+        each state is kept for get_expected_error.
+        '''
+        word_count, run_count = len(self.words), len(self.runs)
+        # states[words][runs] is the lowest cost of aligning the first words to the first runs, the start of the
+        # last group of that alignment, and the log of the summed likelihoods of all the alignments
+        self.states = [dict() for _ in range(word_count + 1)]
+        self.states[0][0] = (0.0, None, 0.0)
+        for word_start in range(word_count + 1):
+            # Skipped runs add states of the same word, so the runs are visited in order rather than from a snapshot
+            for run_start in self.get_start_runs(word_start):
+                if run_start not in self.states[word_start]:
+                    continue
+                cost, _, log_likelihood = self.states[word_start][run_start]
+                for word_end, run_end, group_cost in self.get_next_groups(word_start, run_start):
+                    best_cost, best_start, summed_log_likelihood = self.states[word_end].get(run_end, (math.inf, None, -math.inf))
+                    if cost + group_cost < best_cost:
+                        best_cost, best_start = cost + group_cost, (word_start, run_start)
+                    summed_log_likelihood = np.logaddexp(summed_log_likelihood, log_likelihood - group_cost)
+                    self.states[word_end][run_end] = (best_cost, best_start, summed_log_likelihood)
+        if run_count not in self.states[word_count]:
+            return None
+        groups = []
+        word_end, run_end = word_count, run_count
+        while word_end or run_end:
+            word_start, run_start = self.states[word_end][run_end][1]
+            groups.append((word_start, word_end, run_start, run_end))
+            word_end, run_end = word_start, run_start
+        return groups[::-1]
+
+    def get_voiced_time(self, run_start, run_end, voiced_offset):
+        '''Time of the point voiced_offset seconds into the voiced frames of the runs, skipping the silences between them'''
+        for run in range(run_start, run_end):
+            start, end = self.runs[run]
+            if voiced_offset <= end - start or run == run_end - 1:
+                return start + min(voiced_offset, end - start)
+            voiced_offset -= end - start
+
+    def get_boundary_times(self, word_start, word_end, run_start, run_end):
+        '''Times of the word boundaries of a group, the words sharing the voiced time of its runs by their letters'''
+        voiced_duration = self.voiced[run_end] - self.voiced[run_start]
+        group_letters = self.letters[word_end] - self.letters[word_start]
+        return [self.get_voiced_time(run_start, run_end, voiced_duration * (self.letters[boundary] - self.letters[word_start]) / group_letters)
+                for boundary in range(word_start, word_end + 1)]
+
+    def get_duration_spread(self, groups):
+        '''Spread of the log ratio of spoken to expected word durations, measured on the groups and pulled to the prior'''
+        squares = [(word_end - word_start) * self.get_log_ratio(word_start, word_end, run_start, run_end) ** 2
+                   for word_start, word_end, run_start, run_end in groups if word_end > word_start]
+        return math.sqrt((sum(squares) + PRIOR_WEIGHT * PRIOR_DURATION_SPREAD ** 2) / (len(squares) + PRIOR_WEIGHT))
+
+    def get_interior_errors(self, spread, word_start, word_end, run_start, run_end):
+        '''
+        Expected error of each word boundary of a group. The first and last are at silences and known to a frame, the
+        others are off by the accumulated spread of the word durations, most in the middle of the group.
+        '''
+        word_count = word_end - word_start
+        voiced_duration = self.voiced[run_end] - self.voiced[run_start]
+        return [max(0.8 * spread * voiced_duration * math.sqrt(position * (word_count - position) / word_count) / word_count, FRAME_DURATION)
+                for position in range(word_count + 1)]
+
+    def get_word_alignment(self, groups):
+        word_alignment = []
+        for word_start, word_end, run_start, run_end in groups:
+            if word_end == word_start:
+                continue
+            times = self.get_boundary_times(word_start, word_end, run_start, run_end)
+            for i, word in enumerate(self.words[word_start:word_end]):
+                word_alignment.append({'text': word, 'start': round(float(times[i]), 3), 'end': round(float(times[i + 1]), 3)})
+        return word_alignment
+
+    def get_expected_error(self, groups):
+        '''
+        Mean expected error in seconds of the word boundaries of the groups. Every alignment is weighted by its
+        posterior probability, found with a backward pass over the states of align, so an alignment that other
+        alignments with different word times nearly match is not trusted, even when each of its groups fits well.
+        '''
+        word_count, run_count = len(self.words), len(self.runs)
+        spread = self.get_duration_spread(groups)
+        best_times = np.zeros((word_count, 2))
+        for word_start, word_end, run_start, run_end in groups:
+            if word_end == word_start:
+                continue
+            times = self.get_boundary_times(word_start, word_end, run_start, run_end)
+            best_times[word_start:word_end, 0], best_times[word_start:word_end, 1] = times[:-1], times[1:]
+        total_log_likelihood = self.states[word_count][run_count][2]
+        # backward[words][runs] is the log of the summed likelihoods of the alignments of the remaining words and runs
+        backward = [dict() for _ in range(word_count + 1)]
+        backward[word_count][run_count] = 0.0
+        errors, weights = np.zeros((word_count, 2)), np.zeros(word_count)
+        for word_start in range(word_count, -1, -1):
+            for run_start in reversed(self.get_start_runs(word_start)):
+                if run_start not in self.states[word_start]:
+                    continue
+                forward_log_likelihood = self.states[word_start][run_start][2]
+                summed_log_likelihood = -math.inf
+                for word_end, run_end, group_cost in self.get_next_groups(word_start, run_start):
+                    if run_end not in backward[word_end]:
+                        continue
+                    log_likelihood = backward[word_end][run_end] - group_cost
+                    summed_log_likelihood = np.logaddexp(summed_log_likelihood, log_likelihood)
+                    posterior = math.exp(forward_log_likelihood + log_likelihood - total_log_likelihood)
+                    if word_end == word_start or posterior < 1e-4:
+                        continue
+                    times = self.get_boundary_times(word_start, word_end, run_start, run_end)
+                    interior_errors = self.get_interior_errors(spread, word_start, word_end, run_start, run_end)
+                    for i in range(word_end - word_start):
+                        word = word_start + i
+                        errors[word, 0] += posterior * (abs(times[i] - best_times[word, 0]) + interior_errors[i])
+                        errors[word, 1] += posterior * (abs(times[i + 1] - best_times[word, 1]) + interior_errors[i + 1])
+                        weights[word] += posterior
+                if summed_log_likelihood > -math.inf:
+                    backward[word_start][run_start] = summed_log_likelihood
+        return float(np.mean(errors / np.maximum(weights, 1e-9)[:, None]))
+
+
+def align_words(audio_path, script):
+    '''
+    Times of the words of a known script in its audio, as {'text', 'start', 'end'} in seconds, and the expected error
+    of the word boundaries in seconds. Returns (None, None) when the script or the audio cannot be aligned.
+    '''
+    words = script.split()
+    if not words or len("".join(words)) / len(words) > MAX_AVERAGE_WORD_LENGTH:
+        return None, None
+    runs = get_voiced_runs(get_voiced_probability(load_audio_samples(audio_path)))
+    if not runs:
+        return None, None
+    alignment = GroupAlignment(words, runs)
+    groups = alignment.align()
+    if groups is None:
+        return None, None
+    return alignment.get_word_alignment(groups), alignment.get_expected_error(groups)
+
+
+def get_word_alignment(audio_path, script, max_expected_error=MAX_EXPECTED_ERROR):
+    '''
+    Times of the words of a known script in its audio, found from the silences of the audio and the letters of the words.
+    Much cheaper than a Whisper transcription, for voiceovers whose text is known. Returns None when the script or the
+    audio cannot be aligned this way, or when the expected error of the word boundaries is above max_expected_error,
+    as for speech with few pauses between words.
+    '''
+    word_alignment, expected_error = align_words(audio_path, script)
+    if word_alignment is None or expected_error > max_expected_error:
+        return None
+    return word_alignment
+
+
+def align_script(audio_path, script):
+    '''Whisper analysis structure of a known script aligned to its audio, or None when it cannot be reliably aligned'''
+    word_alignment = get_word_alignment(audio_path, script)
+    if word_alignment is None:
+        return None
+    return alignment_to_whisper_analysis(word_alignment)
@@ -0,0 +1,113 @@
+from abc import ABC, abstractmethod
+from enum import Enum
+
+from shortGPT.audio.whisper_model_pool import (WHISPER_CPU_THREADS,
+                                               WHISPER_MODEL_POOL,
+                                               WARMUP_SAMPLE_RATE,
+                                               WhisperModelPool)
+
+
+class TranscriberBackend(Enum):
+    WHISPER_TIMESTAMPED = "whisper_timestamped"
+    FASTER_WHISPER = "faster_whisper"
+
+
+class Transcriber(ABC):
+    '''
+    Transcribes an audio file into the whisper_timestamped analysis structure:
+    {'text': str, 'language': str, 'segments': [{'id', 'start', 'end', 'text', 'words': [{'text', 'start', 'end', 'confidence'}]}]}
+    '''
+
+    @abstractmethod
+    def transcribe(self, filename, model_size="base") -> dict:
+        pass
+
+    def get_options(self) -> dict:
+        '''Options that change the transcriptions, part of their cache key'''
+        return {}
+
+
+class WhisperTimestampedTranscriber(Transcriber):
+    '''Openai Whisper models run by torch, with the word timestamps of whisper_timestamped'''
+
+    def __init__(self, model_pool: WhisperModelPool = WHISPER_MODEL_POOL):
+        self.model_pool = model_pool
+
+    def get_options(self) -> dict:
+        return {'fp16': False}
+
+    def transcribe(self, filename, model_size="base") -> dict:
+        from whisper_timestamped import transcribe_timestamped
+        pooled_model = self.model_pool.get(model_size)
+        with pooled_model.lock:
+            return transcribe_timestamped(pooled_model.model, filename, verbose=False, fp16=False)
+
+
+def load_faster_whisper_model(model_size, device="cpu", compute_type="int8"):
+    from faster_whisper import WhisperModel
+    return WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=int(WHISPER_CPU_THREADS or 0))
+
+
+def warmup_faster_whisper_model(model):
+    import numpy as np
+    segments, _ = model.transcribe(np.zeros(WARMUP_SAMPLE_RATE, dtype=np.float32), beam_size=1)
+    list(segments)
+
+
+FASTER_WHISPER_MODEL_POOL = WhisperModelPool(load_faster_whisper_model, warmup_faster_whisper_model, num_threads=None)
+
+
+class FasterWhisperTranscriber(Transcriber):
+    '''
+    The same Whisper models converted to CTranslate2 by faster-whisper, quantized to int8 on CPU by default.
+    Decoding is greedy (beam_size=1) like whisper_timestamped's default, and the words are given as
+    whisper_timestamped gives them, stripped and with their probability as confidence.
+    '''
+
+    def __init__(self, device="cpu", compute_type="int8", beam_size=1, model_pool: WhisperModelPool = FASTER_WHISPER_MODEL_POOL):
+        self.device = device
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.model_pool = model_pool
+
+    def get_options(self) -> dict:
+        return {'device': self.device, 'compute_type': self.compute_type, 'beam_size': self.beam_size}
+
+    def transcribe(self, filename, model_size="base") -> dict:
+        pooled_model = self.model_pool.get(model_size, device=self.device, compute_type=self.compute_type)
+        with pooled_model.lock:
+            segments, info = pooled_model.model.transcribe(filename, beam_size=self.beam_size, word_timestamps=True)
+            segments = list(segments)
+        analysis_segments = []
+        for i, segment in enumerate(segments):
+            analysis_segments.append({
+                'id': i,
+                'start': round(segment.start, 2),
+                'end': round(segment.end, 2),
+                'text': segment.text,
+                'avg_logprob': segment.avg_logprob,
+                'no_speech_prob': segment.no_speech_prob,
+                'words': [{
+                    'text': word.word.strip(),
+                    'start': round(word.start, 2),
+                    'end': round(word.end, 2),
+                    'confidence': round(word.probability, 3),
+                } for word in (segment.words or []) if word.word.strip()],
+            })
+        return {
+            'text': "".join(segment['text'] for segment in analysis_segments),
+            'segments': analysis_segments,
+            'language': info.language,
+        }
+
+
+_TRANSCRIBERS = {}
+
+
+def get_transcriber(backend: TranscriberBackend = TranscriberBackend.WHISPER_TIMESTAMPED) -> Transcriber:
+    if backend not in _TRANSCRIBERS:
+        if backend == TranscriberBackend.FASTER_WHISPER:
+            _TRANSCRIBERS[backend] = FasterWhisperTranscriber()
+        else:
+            _TRANSCRIBERS[backend] = WhisperTimestampedTranscriber()
+    return _TRANSCRIBERS[backend]
@@ -0,0 +1,80 @@
+import argparse
+import re
+import time
+from difflib import SequenceMatcher
+from statistics import mean
+
+from shortGPT.audio.audio_duration import get_asset_duration
+from shortGPT.audio.transcribers import TranscriberBackend, get_transcriber
+
+
+def get_words(analysis):
+    return [word for segment in analysis['segments'] for word in segment['words']]
+
+
+def normalize_word(text):
+    return re.sub(r"[^\w']", "", text.lower())
+
+
+def get_timestamp_drift(reference, candidate):
+    '''Start and end time differences of the words that both analyses transcribed identically, and the share of such words'''
+    reference_words, candidate_words = get_words(reference), get_words(candidate)
+    matcher = SequenceMatcher(a=[normalize_word(w['text']) for w in reference_words],
+                              b=[normalize_word(w['text']) for w in candidate_words], autojunk=False)
+    drifts = []
+    for block in matcher.get_matching_blocks():
+        for i in range(block.size):
+            reference_word, candidate_word = reference_words[block.a + i], candidate_words[block.b + i]
+            drifts.append(abs(reference_word['start'] - candidate_word['start']))
+            drifts.append(abs(reference_word['end'] - candidate_word['end']))
+    matched_share = len(drifts) / 2 / max(len(reference_words), 1)
+    return drifts, matched_share
+
+
+def run_benchmark(clips, model_size="base", backends=tuple(TranscriberBackend)):
+    '''
+    Transcribes each clip with each backend, after a warmup transcription so model loads are not timed.
+    Prints the real-time factor of each backend, and the word timestamp drift of each backend against the first one.
+    '''
+    durations = {clip: get_asset_duration(clip, isVideo=False)[1] for clip in clips}
+    results = {}
+    for backend in backends:
+        transcriber = get_transcriber(backend)
+        transcriber.transcribe(clips[0], model_size=model_size)
+        results[backend] = {}
+        for clip in clips:
+            start_time = time.perf_counter()
+            analysis = transcriber.transcribe(clip, model_size=model_size)
+            results[backend][clip] = (time.perf_counter() - start_time, analysis)
+
+    reference_backend = backends[0]
+    total_duration = sum(durations.values())
+    print(f"{len(clips)} clips, {total_duration:.1f}s of audio, model {model_size}")
+    for backend in backends:
+        elapsed = sum(elapsed for elapsed, _ in results[backend].values())
+        line = f"{backend.value:>20}: {elapsed:.1f}s, real-time factor {elapsed / total_duration:.3f}"
+        if backend != reference_backend:
+            drifts, matched_shares = [], []
+            for clip in clips:
+                clip_drifts, matched_share = get_timestamp_drift(results[reference_backend][clip][1], results[backend][clip][1])
+                drifts.extend(clip_drifts)
+                matched_shares.append(matched_share)
+            if drifts:
+                drifts.sort()
+                line += (f", drift vs {reference_backend.value}: mean {mean(drifts) * 1000:.0f}ms,"
+                         f" p95 {drifts[int(len(drifts) * 0.95)] * 1000:.0f}ms, max {drifts[-1] * 1000:.0f}ms,"
+                         f" {mean(matched_shares):.0%} of words matched")
+        print(line)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m shortGPT.audio.transcription_benchmark",
+                                     description="Compare the speed and word timestamps of the transcription backends on the same clips.")
+    parser.add_argument("clips", nargs="+", help="Audio or video files to transcribe.")
+    parser.add_argument("--model-size", default="base")
+    parser.add_argument("--backends", nargs="+", choices=[backend.value for backend in TranscriberBackend],
+                        default=[backend.value for backend in TranscriberBackend],
+                        help="Backends to compare, the drift is measured against the first one.")
+    args = parser.parse_args()
+    run_benchmark(args.clips, args.model_size, tuple(TranscriberBackend(backend) for backend in args.backends))
@@ -0,0 +1,77 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+from shortGPT.audio.transcribers import Transcriber, TranscriberBackend
+from shortGPT.config.hashing import hash_file
+from shortGPT.editing_utils.media_probe import get_source_key
+
+TRANSCRIPTION_CACHE_DIR = '.database/transcriptions'
+# Changing it invalidates every cached transcription, for changes of the analysis structure
+TRANSCRIPTION_CACHE_VERSION = 1
+
+
+def get_audio_key(filename):
+    '''Identity of the transcribed audio: the sha256 of a local file, or the stable identity of a url'''
+    if os.path.isfile(filename):
+        return {'sha256': hash_file(filename)}
+    return get_source_key(filename)
+
+
+class TranscriptionCache:
+    '''
+    Whisper analyses stored as gzipped JSON files, keyed by the audio content, model size, backend and
+    transcriber options. Files are written to a unique temporary path then renamed, so several threads and processes
+    can share it.
+    '''
+
+    def __init__(self, cache_dir=TRANSCRIPTION_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def get_key(self, filename, model_size, backend: TranscriberBackend, options):
+        key = {
+            'version': TRANSCRIPTION_CACHE_VERSION,
+            'audio': get_audio_key(filename),
+            'model_size': model_size,
+            'backend': backend.value,
+            'options': options,
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json.gz")
+
+    def get(self, key):
+        try:
+            with open(self.get_path(key), 'rb') as f:
+                return json.loads(gzip.decompress(f.read()))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, analysis):
+        '''Stores an analysis. Each writer writes its own temporary file, and a failed write only skips the cache'''
+        temporary_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".tmp", delete=False) as f:
+                temporary_path = f.name
+                f.write(gzip.compress(json.dumps(analysis, separators=(',', ':'), default=float).encode('utf-8'), compresslevel=6))
+            os.replace(temporary_path, self.get_path(key))
+        except OSError as e:
+            print(f"Failed caching the transcription {key}. {e}")
+            if temporary_path and os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+    def transcribe(self, transcriber: Transcriber, backend: TranscriberBackend, filename, model_size="base"):
+        '''Returns the cached analysis of the audio, or transcribes it and stores the analysis'''
+        key = self.get_key(filename, model_size, backend, transcriber.get_options())
+        analysis = self.get(key)
+        if analysis is None:
+            analysis = transcriber.transcribe(filename, model_size=model_size)
+            self.put(key, analysis)
+        return analysis
+
+
+TRANSCRIPTION_CACHE = TranscriptionCache()
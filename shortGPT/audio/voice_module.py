@@ -3,7 +3,7 @@ class VoiceModule(ABC):
 
     def __init__(self):
         pass
-    @abstractmethod    
+    @abstractmethod
     def update_usage(self):
         pass
 
@@ -13,4 +13,11 @@ class VoiceModule(ABC):
 
     @abstractmethod
     def generate_voice(self,text, outputfile):
-        pass
\ No newline at end of file
+        pass
+
+    def generate_voice_with_alignment(self, text, outputfile):
+        '''
+        Returns the generated file and the time of each spoken word, a list of {'text', 'start', 'end'} in seconds,
+        or None when the provider does not give word timings
+        '''
+        return self.generate_voice(text, outputfile), None
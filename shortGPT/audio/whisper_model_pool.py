@@ -0,0 +1,85 @@
+import os
+import threading
+
+# Number of torch intra-op threads used by the models, the torch default (one per core) if unset
+WHISPER_CPU_THREADS = os.getenv('WHISPER_CPU_THREADS')
+# Comma separated model sizes loaded and warmed up when the UI starts, like "base" or "base,small"
+WHISPER_PRELOAD_MODELS = [size.strip() for size in os.getenv('WHISPER_PRELOAD_MODELS', '').split(',') if size.strip()]
+WARMUP_SAMPLE_RATE = 16000
+
+
+def set_torch_threads(num_threads):
+    import torch
+    torch.set_num_threads(int(num_threads))
+
+
+def load_whisper_timestamped_model(model_size, **options):
+    from whisper_timestamped import load_model
+    return load_model(model_size, **options)
+
+
+def warmup_whisper_timestamped_model(model):
+    '''Transcribes a second of silence, so the first real transcription does not pay for lazy initializations'''
+    import numpy as np
+    from whisper_timestamped import transcribe_timestamped
+    transcribe_timestamped(model, np.zeros(WARMUP_SAMPLE_RATE, dtype=np.float32), verbose=None, fp16=False)
+
+
+class PooledModel:
+    '''A loaded model, and the lock its users hold while transcribing, since a model is not safe to use from several threads at once'''
+
+    def __init__(self, model):
+        self.model = model
+        self.lock = threading.Lock()
+
+
+class WhisperModelPool:
+    '''
+    Loaded models keyed by model size and load options, shared by the threads of a process.
+    Each model is loaded once, on first use or by preload, and concurrent first users wait for the same load.
+    '''
+
+    def __init__(self, load_function=load_whisper_timestamped_model, warmup_function=warmup_whisper_timestamped_model,
+                 num_threads=WHISPER_CPU_THREADS):
+        self.load_function = load_function
+        self.warmup_function = warmup_function
+        self.num_threads = num_threads
+        self.models = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._threads_set = False
+
+    def get(self, model_size="base", **options) -> PooledModel:
+        key = (model_size, tuple(sorted(options.items())))
+        pooled_model = self.models.get(key)
+        if pooled_model is None:
+            with self._lock:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+            with key_lock:
+                pooled_model = self.models.get(key)
+                if pooled_model is None:
+                    self.__set_threads()
+                    pooled_model = PooledModel(self.load_function(model_size, **options))
+                    self.models[key] = pooled_model
+        return pooled_model
+
+    def preload(self, model_sizes=("base",), warmup=True, **options):
+        '''Loads models ahead of their first use, at process start, and runs a warmup transcription on each'''
+        for model_size in model_sizes:
+            pooled_model = self.get(model_size, **options)
+            if warmup and self.warmup_function:
+                with pooled_model.lock:
+                    self.warmup_function(pooled_model.model)
+
+    def set_num_threads(self, num_threads):
+        self.num_threads = num_threads
+        self._threads_set = False
+        self.__set_threads()
+
+    def __set_threads(self):
+        if self.num_threads and not self._threads_set:
+            set_torch_threads(self.num_threads)
+            self._threads_set = True
+
+
+WHISPER_MODEL_POOL = WhisperModelPool()
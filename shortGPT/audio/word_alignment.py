@@ -0,0 +1,40 @@
+from shortGPT.audio.audio_duration import get_asset_duration
+
+# A pause between two words longer than this starts a new segment of the analysis
+SEGMENT_PAUSE = 0.3
+
+
+def get_time_scale(source_audio_path, final_audio_path):
+    '''Ratio of the final audio duration to the source audio duration, to map word times through a speed up'''
+    if not final_audio_path or final_audio_path == source_audio_path:
+        return 1.0
+    _, source_duration = get_asset_duration(source_audio_path, isVideo=False)
+    _, final_duration = get_asset_duration(final_audio_path, isVideo=False)
+    if not source_duration or not final_duration:
+        return 1.0
+    return final_duration / source_duration
+
+
+def alignment_to_whisper_analysis(word_alignment, time_scale=1.0, language=None):
+    '''
+    Converts a word alignment, a list of {'text', 'start', 'end'} in seconds, into the whisper_timestamped analysis
+    structure read by getCaptionsWithTime and getSpeechBlocks. Times are multiplied by time_scale, the ratio given
+    by get_time_scale when the aligned audio was sped up afterwards. Words are grouped into segments at pauses.
+    '''
+    segments = []
+    for word in word_alignment:
+        text = word['text'].strip()
+        if not text:
+            continue
+        start, end = round(word['start'] * time_scale, 3), round(word['end'] * time_scale, 3)
+        if not segments or start - segments[-1]['end'] > SEGMENT_PAUSE:
+            segments.append({'id': len(segments), 'start': start, 'end': end, 'text': "", 'words': []})
+        segment = segments[-1]
+        segment['words'].append({'text': text, 'start': start, 'end': end, 'confidence': 1.0})
+        segment['text'] += " " + text
+        segment['end'] = max(segment['end'], end)
+    return {
+        'text': "".join(segment['text'] for segment in segments),
+        'segments': segments,
+        'language': language,
+    }
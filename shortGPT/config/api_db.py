@@ -1,6 +1,6 @@
 import enum
 import os
-from shortGPT.database.db_document import TinyMongoDocument
+from shortGPT.database.db_document import SQLiteDocument
 from dotenv import load_dotenv
 load_dotenv('./.env')
 class ApiProvider(enum.Enum):
@@ -10,7 +10,7 @@ class ApiProvider(enum.Enum):
 
 
 class ApiKeyManager:
-    api_key_doc_manager = TinyMongoDocument("api_db", "api_keys", "key_doc", create=True)
+    api_key_doc_manager = SQLiteDocument("api_db", "api_keys", "key_doc", create=True)
 
     @classmethod
     def get_api_key(cls, key: str or ApiProvider):
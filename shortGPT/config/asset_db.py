@@ -1,6 +1,8 @@
+import atexit
 import base64
-import re
+import os
 import shutil
+import threading
 import time
 from datetime import datetime
 from pathlib import Path
@@ -8,13 +10,19 @@ import enum
 import pandas as pd
 
 from shortGPT.audio.audio_utils import downloadYoutubeAudio, get_asset_duration
-from shortGPT.database.db_document import TinyMongoDocument
+from shortGPT.database.db_document import SQLiteDocument
+from shortGPT.editing_utils.background_mirror import get_background_mirror
+from shortGPT.editing_utils.handle_videos import get_youtube_video_format
+from shortGPT.editing_utils.media_probe import probe_media_files
+from shortGPT.editing_utils.youtube_resolver import YOUTUBE_RESOLVER
 
 AUDIO_EXTENSIONS = {".mp3", ".m4a", ".wav", ".flac", ".aac", ".ogg", ".wma", ".opus"}
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg", ".webp"}
 VIDEO_EXTENSIONS = {".mp4", ".mkv", ".flv", ".avi", ".mov", ".wmv", ".webm", ".m4v"}
 TEMPLATE_ASSETS_DB_PATH = '.database/template_asset_db.json'
 ASSETS_DB_PATH = '.database/asset_db.json'
+# Seconds the access timestamps of assets are kept in memory before being written to the database
+TIMESTAMP_FLUSH_INTERVAL = 60
 
 class AssetType(enum.Enum):
     VIDEO = "video"
@@ -24,65 +32,176 @@ class AssetType(enum.Enum):
     BACKGROUND_VIDEO = "background video"
     OTHER = "other"
 
+class AssetIndex:
+    """
+    In-memory copy of the local and remote asset documents, with lookups by name and by type.
+    It is reloaded when another connection or process commits to the asset database, and written
+    through on every change. Access timestamps are only kept in memory, and written together
+    every TIMESTAMP_FLUSH_INTERVAL seconds and at exit.
+    """
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.assets = {source: {} for source in documents}
+        self.pending_timestamps = {source: {} for source in documents}
+        self.pending_since = None
+        self._lock = threading.RLock()
+        self._data_version = None
+        atexit.register(self.flush_timestamps)
+
+    def refresh(self):
+        database = next(iter(self.documents.values())).database
+        with self._lock:
+            data_version = database.data_version()
+            if data_version == self._data_version:
+                return
+            for source, document in self.documents.items():
+                assets = document._get() or {}
+                for name, ts in self.pending_timestamps[source].items():
+                    if name in assets:
+                        assets[name]['ts'] = ts
+                self.assets[source] = assets
+            self._data_version = data_version
+
+    def find(self, name: str):
+        """Returns the source and a copy of the record of an asset, or (None, None)"""
+        self.refresh()
+        with self._lock:
+            for source, assets in self.assets.items():
+                if name in assets:
+                    return source, dict(assets[name])
+        return None, None
+
+    def get_assets(self, source: str):
+        self.refresh()
+        with self._lock:
+            return {name: dict(asset) for name, asset in self.assets[source].items()}
+
+    def get_names(self, asset_type: str):
+        """Names of the assets of a type, most recently used first"""
+        self.refresh()
+        with self._lock:
+            assets = [(asset.get('ts') or '', name) for source_assets in self.assets.values()
+                      for name, asset in source_assets.items() if asset.get('type') == asset_type]
+        return [name for _, name in sorted(assets, reverse=True)]
+
+    def put(self, source: str, name: str, asset: dict):
+        self.put_many(source, {name: asset})
+
+    def put_many(self, source: str, assets: dict):
+        """Writes several assets in a single transaction"""
+        if not assets:
+            return
+        with self._lock:
+            self.refresh()
+            self.documents[source]._save(assets)
+            for name, asset in assets.items():
+                self.assets[source][name] = dict(asset)
+                self.pending_timestamps[source].pop(name, None)
+
+    def delete(self, source: str, name: str):
+        with self._lock:
+            self.refresh()
+            self.documents[source]._delete(name)
+            self.assets[source].pop(name, None)
+            self.pending_timestamps[source].pop(name, None)
+
+    def touch(self, source: str, name: str):
+        """Records an access to an asset in memory"""
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            if name in self.assets[source]:
+                self.assets[source][name]['ts'] = ts
+            self.pending_timestamps[source][name] = ts
+            if self.pending_since is None:
+                self.pending_since = time.monotonic()
+            flush_due = time.monotonic() - self.pending_since > TIMESTAMP_FLUSH_INTERVAL
+        if flush_due:
+            self.flush_timestamps()
+
+    def flush_timestamps(self):
+        """Writes the access timestamps kept in memory, of the assets that still exist"""
+        with self._lock:
+            self.refresh()
+            for source, timestamps in self.pending_timestamps.items():
+                updates = {f"{name}.ts": ts for name, ts in timestamps.items() if name in self.assets[source]}
+                if updates:
+                    self.documents[source]._save(updates)
+                timestamps.clear()
+            self.pending_since = None
+
+
 class AssetDatabase:
     """
     Class for managing assets, both local and remote.
     The class provides methods to add, remove, get and sync assets.
-    It uses a MongoDB-like database to store information about the assets.
+    It uses a MongoDB-like database to store information about the assets, read through an in-memory AssetIndex.
     """
 
     if not Path(ASSETS_DB_PATH).exists() and Path(TEMPLATE_ASSETS_DB_PATH).exists():
-        shutil.copy(TEMPLATE_ASSETS_DB_PATH, ASSETS_DB_PATH)
-
-    local_assets = TinyMongoDocument("asset_db", "asset_collection", "local_assets", create=True)
-    remote_assets = TinyMongoDocument("asset_db", "asset_collection", "remote_assets", create=True)
-    if not remote_assets._get('subscribe animation'):
-        remote_assets._save({
-            'subscribe animation':{
-                "type": AssetType.VIDEO.value,
-                "url": "https://www.youtube.com/watch?v=72WhUT0OM98",
-                "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+        # Copied then renamed, so another process never imports a partially copied file
+        shutil.copy(TEMPLATE_ASSETS_DB_PATH, f"{ASSETS_DB_PATH}.{os.getpid()}.tmp")
+        os.replace(f"{ASSETS_DB_PATH}.{os.getpid()}.tmp", ASSETS_DB_PATH)
+
+    local_assets = SQLiteDocument("asset_db", "asset_collection", "local_assets", create=True)
+    remote_assets = SQLiteDocument("asset_db", "asset_collection", "remote_assets", create=True)
+    index = AssetIndex({'local': local_assets, 'remote': remote_assets})
+    if index.find('subscribe animation') == (None, None):
+        index.put('remote', 'subscribe animation', {
+            "type": AssetType.VIDEO.value,
+            "url": "https://www.youtube.com/watch?v=72WhUT0OM98",
+            "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         })
 
     @classmethod
     def asset_exists(cls, name: str) -> bool:
-        return name in cls.local_assets._get() or name in cls.remote_assets._get()
+        source, _ = cls.index.find(name)
+        return source is not None
 
     @classmethod
     def add_local_asset(cls, name: str, asset_type: AssetType, path: str):
-        cls.local_assets._save({
-            name: {
-                "type": asset_type.value,
-                "path": path,
-                "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+        cls.index.put('local', name, {
+            "type": asset_type.value,
+            "path": path,
+            "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         })
 
     @classmethod
     def add_remote_asset(cls, name: str, asset_type: AssetType, url: str):
-        cls.remote_assets._save({
-            name: {
-                "type": asset_type.value,
-                "url": url,
-                "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+        cls.index.put('remote', name, {
+            "type": asset_type.value,
+            "url": url,
+            "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         })
 
     @classmethod
     def remove_asset(cls, name: str):
-        if name in cls.local_assets._get():
+        source, _ = cls.index.find(name)
+        if source == 'local':
             cls._remove_local_asset(name)
-        elif name in cls.remote_assets._get():
-            cls.remote_assets._delete(name)
+        elif source == 'remote':
+            cls.index.delete('remote', name)
         else:
             raise ValueError(f"Asset '{name}' does not exist in the database.")
 
+    @classmethod
+    def get_asset_names(cls, asset_type: AssetType) -> list:
+        """
+        Get the names of the assets of a type, most recently used first.
+
+        Args:
+            asset_type (AssetType): Type of the assets.
+
+        Returns:
+            list: Names of the assets.
+        """
+        return cls.index.get_names(asset_type.value)
+
     @classmethod
     def get_df(cls, source=None) -> pd.DataFrame:
         data = []
         if source is None or source == 'local':
-            for key, asset in cls.local_assets._get().items():
+            for key, asset in cls.index.get_assets('local').items():
                 data.append({'name': key,
                              'type': asset['type'],
                              'link': asset['path'],
@@ -90,7 +209,7 @@ class AssetDatabase:
                              'ts': asset.get('ts')
                              })
         if source is None or source == 'youtube':
-            for key, asset in cls.remote_assets._get().items():
+            for key, asset in cls.index.get_assets('remote').items():
                 data.append({'name': key,
                             'type': asset['type'],
                              'link': asset['url'],
@@ -109,12 +228,43 @@ class AssetDatabase:
         """
         Loads all local assets from the static-assets folder into the database.
         """
-        local_assets = cls.local_assets._get()
-        local_paths = {asset['path'] for asset in local_assets.values()}
+        cls.ingest_local_assets(['public'])
+
+    @classmethod
+    def ingest_local_assets(cls, paths, asset_type: AssetType = None, max_workers=None) -> list:
+        """
+        Adds the files at the given paths, and in the given directories, that are not in the database yet.
+        The duration, resolution, fps, codecs, keyframe interval and loudness of the audio and video files
+        are probed in a process pool, and all the assets are written in a single transaction.
+
+        Args:
+            paths (list): Files and directories to ingest.
+            asset_type (AssetType): Type of the assets. By default it is found from each file extension.
+            max_workers (int): Number of probing processes. Defaults to the number of CPUs.
 
-        for path in Path('public').rglob('*'):
-            if path.is_file() and str(path) not in local_paths:
-                cls._add_local_asset_from_path(path)
+        Returns:
+            list: Names of the added assets.
+        """
+        local_paths = {asset['path'] for asset in cls.index.get_assets('local').values()}
+        files = []
+        for path in map(Path, paths):
+            candidates = sorted(path.rglob('*')) if path.is_dir() else [path]
+            files.extend(file for file in candidates if file.is_file() and str(file) not in local_paths)
+        file_types = {file: asset_type or cls._get_asset_type_from_path(file) for file in files}
+        media_files = [str(file) for file, file_type in file_types.items() if file_type not in (AssetType.IMAGE, AssetType.OTHER)]
+        probes = probe_media_files(media_files, max_workers=max_workers)
+
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        assets = {}
+        for file, file_type in file_types.items():
+            assets[file.stem] = {
+                "path": str(file),
+                "type": file_type.value,
+                "ts": ts,
+                **(probes.get(str(file)) or {})
+            }
+        cls.index.put_many('local', assets)
+        return list(assets)
 
     @classmethod
     def get_asset_link(cls, key: str) -> str:
@@ -127,9 +277,10 @@ class AssetDatabase:
         Returns:
             str: Link to the asset.
         """
-        if key in cls.local_assets._get():
+        source, _ = cls.index.find(key)
+        if source == 'local':
             return cls._update_local_asset_timestamp_and_get_link(key)
-        elif key in cls.remote_assets._get():
+        elif source == 'remote':
             return cls._get_remote_asset_link(key)
         else:
             raise ValueError(f"Asset '{key}' does not exist in the database.")
@@ -145,13 +296,46 @@ class AssetDatabase:
         Returns:
             str: Duration of the asset.
         """
-        if key in cls.local_assets._get():
+        source, _ = cls.index.find(key)
+        if source == 'local':
             return cls._get_local_asset_duration(key)
-        elif key in cls.remote_assets._get():
+        elif source == 'remote':
             return cls._get_remote_asset_duration(key)
         else:
             raise ValueError(f"Asset '{key}' does not exist in the database.")
 
+    @classmethod
+    def get_background_mirror(cls, key: str):
+        """
+        Get the local mirror of a background video. It is downloaded and transcoded on first use to a
+        1080x1920 proxy with a keyframe every second, so random clips can be cut from it by stream copy.
+
+        Args:
+            key (str): Name of the asset.
+
+        Returns:
+            dict: The path, duration and keyframe times of the proxy, or None if the video could not be mirrored.
+        """
+        source, asset = cls.index.find(key)
+        if source is None:
+            raise ValueError(f"Asset '{key}' does not exist in the database.")
+        try:
+            return get_background_mirror(asset['path'] if source == 'local' else asset['url'],
+                                         lambda: (cls.get_asset_link(key), cls.get_asset_duration(key)))
+        except Exception as e:
+            print(f"Failed mirroring the background video '{key}'", e.args[0] if e.args else e)
+        return None
+
+    @classmethod
+    def mirror_background_videos(cls) -> list:
+        """
+        Mirror every background video asset that is not mirrored yet.
+
+        Returns:
+            list: Names of the background videos that have a mirror.
+        """
+        return [name for name in cls.get_asset_names(AssetType.BACKGROUND_VIDEO) if cls.get_background_mirror(name)]
+
     @classmethod
     def _remove_local_asset(cls, name: str):
         """
@@ -160,13 +344,13 @@ class AssetDatabase:
         Args:
             name (str): Name of the asset.
         """
-        asset = cls.local_assets._get(name)
+        _, asset = cls.index.find(name)
         if 'required' not in asset:
             try:
                 Path(asset['path']).unlink()
             except FileNotFoundError as e:
                 print(f"File not found: {e}")
-            cls.local_assets._delete(name)
+            cls.index.delete('local', name)
 
     @classmethod
     def _add_local_asset_from_path(cls, path: Path):
@@ -176,22 +360,32 @@ class AssetDatabase:
         Args:
             path (Path): Path to the asset.
         """
-        file_ext = path.suffix
+        asset_type = cls._get_asset_type_from_path(path)
+        cls.index.put('local', path.stem, {
+            "path": str(path),
+            "type": asset_type.value,
+            "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+    @classmethod
+    def _get_asset_type_from_path(cls, path: Path) -> AssetType:
+        """
+        Get the type of a local asset from its file extension.
+
+        Args:
+            path (Path): Path to the asset.
+
+        Returns:
+            AssetType: Type of the asset.
+        """
+        file_ext = path.suffix.lower()
         if file_ext in AUDIO_EXTENSIONS:
-            asset_type = AssetType.AUDIO
+            return AssetType.AUDIO
         elif file_ext in IMAGE_EXTENSIONS:
-            asset_type = AssetType.IMAGE
+            return AssetType.IMAGE
         elif file_ext in VIDEO_EXTENSIONS:
-            asset_type = AssetType.VIDEO
-        else:
-            asset_type = AssetType.OTHER
-        cls.local_assets._save({
-            path.stem: {
-                "path": str(path),
-                "type": asset_type.value,
-                "ts": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-        })
+            return AssetType.VIDEO
+        return AssetType.OTHER
 
     @classmethod
     def _update_local_asset_timestamp_and_get_link(cls, key: str) -> str:
@@ -204,9 +398,8 @@ class AssetDatabase:
         Returns:
             str: Link to the asset.
         """
-        asset = cls.local_assets._get(key)
-        asset['ts'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cls.local_assets._save({key: asset})
+        _, asset = cls.index.find(key)
+        cls.index.touch('local', key)
         return asset['path']
 
     @classmethod
@@ -220,9 +413,8 @@ class AssetDatabase:
         Returns:
             str: Link to the asset.
         """
-        asset = cls.remote_assets._get(key)
-        asset['ts'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cls.remote_assets._save({key: asset})
+        _, asset = cls.index.find(key)
+        cls.index.touch('remote', key)
         if 'youtube' in asset['url']:
             return cls._get_youtube_asset_link(key, asset)
         return asset['url']
@@ -238,10 +430,9 @@ class AssetDatabase:
         Returns:
             str: Duration of the asset.
         """
-        asset = cls.local_assets._get(key)
-        asset['ts'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cls.local_assets._save({key: asset})
-        if 'duration' not in asset and asset['duration'] is not None:
+        _, asset = cls.index.find(key)
+        cls.index.touch('local', key)
+        if asset.get('duration') is None:
             _, duration = cls._update_local_asset_duration(key)
             return duration
         return asset['duration']
@@ -257,9 +448,8 @@ class AssetDatabase:
         Returns:
             str: Duration of the asset.
         """
-        asset = cls.remote_assets._get(key)
-        asset['ts'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cls.remote_assets._save({key: asset})
+        _, asset = cls.index.find(key)
+        cls.index.touch('remote', key)
         if 'duration' in asset and asset['duration'] is not None:
             return asset['duration']
         _, duration = cls._update_youtube_asset_duration(key)
@@ -276,14 +466,14 @@ class AssetDatabase:
         Returns:
             str: Duration of the asset.
         """
-        asset = cls.local_assets._get(key)
+        _, asset = cls.index.find(key)
         path = Path(asset['path'])
         if any(t in asset['type'] for t in ['audio', 'video', 'music']):
             _, duration = get_asset_duration(str(path))
             asset['duration'] = duration
         else:
             duration = None
-        cls.local_assets._save({key: asset})
+        cls.index.put('local', key, asset)
         return str(path), duration
 
     @classmethod
@@ -297,14 +487,16 @@ class AssetDatabase:
         Returns:
             str: Duration of the asset.
         """
-        asset = cls.remote_assets._get(key)
+        _, asset = cls.index.find(key)
         youtube_url = asset['url']
         remote_url, duration = get_asset_duration(youtube_url, isVideo="video" in asset['type'])
-        asset.update({
-            "remote_url": base64.b64encode(remote_url.encode()).decode('utf-8'),
-            "duration": duration,
-        })
-        cls.remote_assets._save({key: asset})
+        encoded_remote_url = base64.b64encode(remote_url.encode()).decode('utf-8')
+        if asset.get('remote_url') != encoded_remote_url or asset.get('duration') != duration:
+            asset.update({
+                "remote_url": encoded_remote_url,
+                "duration": duration,
+            })
+            cls.index.put('remote', key, asset)
         return remote_url, duration
 
     @classmethod
@@ -321,20 +513,16 @@ class AssetDatabase:
         """
         if any(t in asset['type'] for t in ['audio', 'music']):
             local_audio_file, duration = downloadYoutubeAudio(asset['url'], f"public/{key}.wav")
-            cls.local_assets._save({
-                key: {
-                    'path': local_audio_file,
-                    'duration': duration,
-                    'type': 'audio',
-                    'ts': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
+            cls.index.put('local', key, {
+                'path': local_audio_file,
+                'duration': duration,
+                'type': 'audio',
+                'ts': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             })
             return local_audio_file
-        if 'remote_url' in asset:
-            asset['remote_url'] = base64.b64decode(asset['remote_url']).decode('utf-8')
-            expire_timestamp_match = re.search(r"expire=(\d+)", asset['remote_url'])
-            not_expired = expire_timestamp_match and int(expire_timestamp_match.group(1)) > time.time() + 1800
-            if not_expired and 'duration' in asset:
-                return asset['remote_url']
+        if 'remote_url' in asset and asset.get('duration') is not None:
+            # The resolver reuses the stored url until it is about to expire
+            YOUTUBE_RESOLVER.seed(asset['url'], get_youtube_video_format(asset['url']),
+                                  base64.b64decode(asset['remote_url']).decode('utf-8'), asset['duration'])
         remote_url, _ = cls._update_youtube_asset_duration(key)
         return remote_url
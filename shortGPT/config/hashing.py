@@ -0,0 +1,19 @@
+import hashlib
+import os
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_file_hashes = {}
+
+
+def hash_file(path):
+    '''sha256 of a file, memoized on its path, size and mtime'''
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_hashes:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        _file_hashes[memo_key] = sha.hexdigest()
+    return _file_hashes[memo_key]
@@ -0,0 +1,26 @@
+import argparse
+
+from shortGPT.config.asset_db import AssetDatabase, AssetType
+
+
+def main(argv=None):
+    '''Adds a library of local assets to the asset database, probed in parallel and written in one batch'''
+    parser = argparse.ArgumentParser(prog="python -m shortGPT.config.ingest_assets",
+                                     description="Add local files and directories to the ShortGPT asset library.")
+    parser.add_argument("paths", nargs="+", help="Files and directories to ingest, directories are scanned recursively.")
+    parser.add_argument("--type", dest="asset_type", choices=[asset_type.value for asset_type in AssetType],
+                        help="Type of the assets, by default it is found from each file extension.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of probing processes, by default the number of CPUs.")
+    parser.add_argument("--mirror", action="store_true", help="Also mirror every background video into its local proxy.")
+    args = parser.parse_args(argv)
+
+    asset_type = AssetType(args.asset_type) if args.asset_type else None
+    names = AssetDatabase.ingest_local_assets(args.paths, asset_type=asset_type, max_workers=args.workers)
+    print(f"Added {len(names)} assets to the asset library")
+    if args.mirror:
+        mirrored = AssetDatabase.mirror_background_videos()
+        print(f"{len(mirrored)} background videos are mirrored")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+BLOB_STORE_DIR = "./.database/blobs"
+# Values whose JSON is larger than this many bytes are stored as blobs instead of inline in their document
+BLOB_SIZE_THRESHOLD = 8192
+BLOB_REFERENCE_KEY = "$blob"
+
+
+class BlobStore:
+    '''
+    Content-addressed store of JSON values, one gzipped file per value named by the sha256 of its JSON.
+    Documents hold a {"$blob": sha256} reference in place of the value. Identical values share one file,
+    and a file is never modified once written, so several processes can use the same store.
+    '''
+
+    def __init__(self, blob_dir=BLOB_STORE_DIR, size_threshold=BLOB_SIZE_THRESHOLD):
+        self.blob_dir = blob_dir
+        self.size_threshold = size_threshold
+
+    def get_blob_path(self, sha):
+        return os.path.join(self.blob_dir, sha[:2], f"{sha}.json.gz")
+
+    @staticmethod
+    def is_reference(value):
+        return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(BLOB_REFERENCE_KEY), str)
+
+    def write_blob(self, blob_path, compressed_data):
+        '''
+        Writes a blob through a temporary file unique to the writer. Another thread or process storing the same
+        value can write it at the same time, the blob is then written once it exists, whichever writer renamed it.
+        '''
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(blob_path), suffix=".tmp", delete=False) as f:
+            temporary_path = f.name
+            f.write(compressed_data)
+        try:
+            os.replace(temporary_path, blob_path)
+        except OSError:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            if not os.path.exists(blob_path):
+                raise
+
+    def store(self, value):
+        '''Returns the value unchanged if it is small, or writes it to the store and returns its reference'''
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        data = json.dumps(value).encode('utf-8')
+        if len(data) <= self.size_threshold:
+            return value
+        sha = hashlib.sha256(data).hexdigest()
+        blob_path = self.get_blob_path(sha)
+        if not os.path.exists(blob_path):
+            self.write_blob(blob_path, gzip.compress(data, compresslevel=6))
+        return {BLOB_REFERENCE_KEY: sha}
+
+    def load(self, reference):
+        blob_path = self.get_blob_path(reference[BLOB_REFERENCE_KEY])
+        try:
+            with open(blob_path, 'rb') as f:
+                return json.loads(gzip.decompress(f.read()))
+        except FileNotFoundError:
+            raise Exception(f"The blob {reference[BLOB_REFERENCE_KEY]} referenced by the database is missing from {self.blob_dir}")
+
+    def resolve(self, value):
+        '''Replaces the blob references in a value read from a document by the values they point to'''
+        if self.is_reference(value):
+            return self.load(value)
+        if isinstance(value, dict):
+            return {key: self.resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.resolve(item) for item in value]
+        return value
+
+
+BLOB_STORE = BlobStore()
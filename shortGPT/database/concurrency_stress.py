@@ -0,0 +1,78 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from shortGPT.database.blob_store import BlobStore
+from shortGPT.database.content_data_manager import ContentDataManager
+from shortGPT.database.db_document import SQLITE_DATABASE_DIR, SQLiteDocument
+
+STRESS_COLLECTION = "stress"
+STRESS_DOCUMENT_ID = "shared"
+
+
+def run_writer(db_name, blob_dir, worker, updates):
+    '''
+    Makes dotted-key saves whose parents do not exist yet, so the writers race to create them,
+    then batched ContentDataManager commits of several keys, all into the same document
+    '''
+    document = SQLiteDocument(db_name, STRESS_COLLECTION, STRESS_DOCUMENT_ID, create=True)
+    for i in range(updates):
+        document._save({f"writers.{worker}.{i}": i})
+    data_manager = ContentDataManager(document, "stress", blob_store=BlobStore(blob_dir))
+    for i in range(updates):
+        data_manager.begin_batch()
+        data_manager.save(f"batches.{worker}_{i}.index", i)
+        data_manager.save(f"batches.{worker}_{i}.worker", worker)
+        data_manager.save(f"batch_count_{worker}", i + 1)
+        data_manager.commit_batch()
+
+
+def check_document(data, workers, updates):
+    for worker in range(workers):
+        saved = data.get('writers', {}).get(str(worker), {})
+        missing = [i for i in range(updates) if saved.get(str(i)) != i]
+        assert not missing, f"Writer {worker} lost {len(missing)} of its {updates} saves"
+        missing = [i for i in range(updates) if data.get('batches', {}).get(f"{worker}_{i}") != {'index': i, 'worker': worker}]
+        assert not missing, f"Writer {worker} lost {len(missing)} of its {updates} batched commits"
+        assert data.get(f"batch_count_{worker}") == updates, f"Writer {worker} last batch count is {data.get(f'batch_count_{worker}')}"
+
+
+def run_stress_test(workers=16, updates=200):
+    '''
+    Runs concurrent writer processes on a new SQLite database, and checks that no update was lost.
+    The database and its blobs are removed afterwards.
+    '''
+    db_name = f"concurrency_stress_{uuid.uuid4().hex}"
+    blob_dir = tempfile.mkdtemp()
+    start_time = time.perf_counter()
+    try:
+        processes = [multiprocessing.Process(target=run_writer, args=(db_name, blob_dir, worker, updates)) for worker in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        failed = [worker for worker, process in enumerate(processes) if process.exitcode != 0]
+        assert not failed, f"Writers {failed} exited with an error"
+        data = SQLiteDocument(db_name, STRESS_COLLECTION, STRESS_DOCUMENT_ID)._get()
+        check_document(data, workers, updates)
+    finally:
+        shutil.rmtree(blob_dir, ignore_errors=True)
+        for suffix in ("", "-wal", "-shm"):
+            path = os.path.join(SQLITE_DATABASE_DIR, f"{db_name}.sqlite3{suffix}")
+            if os.path.exists(path):
+                os.remove(path)
+    print(f"{workers} writers made {workers * updates} saves and {workers * updates} batched commits "
+          f"in {time.perf_counter() - start_time:.1f}s, no update was lost")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m shortGPT.database.concurrency_stress",
+                                     description="Check that concurrent writer processes do not lose updates of the SQLite content database.")
+    parser.add_argument("--workers", type=int, default=16, help="Number of writer processes.")
+    parser.add_argument("--updates", type=int, default=200, help="Saves and batched commits made by each writer.")
+    args = parser.parse_args()
+    run_stress_test(args.workers, args.updates)
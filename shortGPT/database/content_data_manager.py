@@ -1,11 +1,14 @@
+from shortGPT.database.blob_store import BLOB_STORE, BlobStore
 from shortGPT.database.db_document import AbstractDatabaseDocument
 
 
 class ContentDataManager():
 
-    def __init__(self, db_doc: AbstractDatabaseDocument, content_type: str, new=False):
+    def __init__(self, db_doc: AbstractDatabaseDocument, content_type: str, new=False, blob_store: BlobStore = BLOB_STORE):
         self.contentType = content_type
         self.db_doc = db_doc
+        self.blob_store = blob_store
+        self.pending_writes = None
         if new:
             self.db_doc._save({
                 'content_type': content_type,
@@ -14,10 +17,37 @@ class ContentDataManager():
             })
 
     def save(self, key, value):
-        self.db_doc._save({key: value})
+        if self.pending_writes is not None:
+            self.pending_writes.pop(key, None)
+            self.pending_writes[key] = value
+        else:
+            self.db_doc._save({key: self.blob_store.store(value)})
 
     def get(self, key):
-        return self.db_doc._get(key)
+        if self.pending_writes:
+            if key in self.pending_writes:
+                return self.pending_writes[key]
+            if any(pending_key.startswith(key + ".") or key.startswith(pending_key + ".") for pending_key in self.pending_writes):
+                # Nested keys are resolved by the document, so the pending writes are written first
+                self.flush()
+        # Large values are stored out of the document, and only loaded when their key is read
+        return self.blob_store.resolve(self.db_doc._get(key))
+
+    def begin_batch(self):
+        '''Buffers the following saves in memory until commit_batch is called'''
+        if self.pending_writes is None:
+            self.pending_writes = {}
+
+    def flush(self):
+        '''Writes the buffered saves in a single transaction, and keeps buffering'''
+        if self.pending_writes:
+            self.db_doc._save({key: self.blob_store.store(value) for key, value in self.pending_writes.items()})
+            self.pending_writes = {}
+
+    def commit_batch(self):
+        '''Writes the buffered saves in a single transaction and stops buffering'''
+        self.flush()
+        self.pending_writes = None
 
     def _getId(self):
         return self.db_doc._getId()
@@ -1,18 +1,31 @@
 from uuid import uuid4
-from shortGPT.database.db_document import TINY_MONGO_DATABASE, TinyMongoDocument
+from shortGPT.database.blob_store import BLOB_STORE
+from shortGPT.database.db_document import SQLiteDocument, get_sqlite_database
 
 from shortGPT.database.content_data_manager import ContentDataManager
+
+CONTENT_COLLECTION = "content_documents"
+# Secondary indexes of the content documents. Documents are also indexed by _id, the primary key.
+# Unfinished jobs are listed by last_completed_step, so it is the second column of the ready_to_upload index
+CONTENT_INDEXES = {
+    "content_type_src_url": ("content_type", "src_url"),
+    "ready_to_upload": ("ready_to_upload", "last_completed_step"),
+}
+
+
 class ContentDatabase:
     def __init__(self, ):
-        self.content_collection = TINY_MONGO_DATABASE["content_db"]["content_documents"]
+        self.database = get_sqlite_database("content_db")
+        for index_name, keys in CONTENT_INDEXES.items():
+            self.database.create_index(CONTENT_COLLECTION, index_name, keys)
 
     def instanciateContentDataManager(self, id: str, content_type: str, new=False):
-        db_doc = TinyMongoDocument("content_db", "content_documents", id)
+        db_doc = SQLiteDocument("content_db", CONTENT_COLLECTION, id)
         return ContentDataManager(db_doc, content_type, new)
 
     def getContentDataManager(self, id, content_type: str):
         try:
-            db_doc = TinyMongoDocument("content_db", "content_documents", id)
+            db_doc = SQLiteDocument("content_db", CONTENT_COLLECTION, id)
             return ContentDataManager(db_doc, content_type, False)
         except:
             return None
@@ -20,9 +33,24 @@ class ContentDatabase:
     def createContentDataManager(self, content_type: str) -> ContentDataManager:
         try:
             new_short_id = uuid4().hex[:24]
-            db_doc = TinyMongoDocument("content_db", "content_documents", new_short_id, True)
+            db_doc = SQLiteDocument("content_db", CONTENT_COLLECTION, new_short_id, True)
             return ContentDataManager(db_doc, content_type, True)
         except:
             return None
-    
-    
\ No newline at end of file
+
+    def find_one(self, query: dict):
+        return self.database.find_one(CONTENT_COLLECTION, query)
+
+    def find_cached_translation(self, src_url: str, content_type="content_translation"):
+        '''Returns the speech_blocks and original_language of a finished content document of this type made from the same source url, or None'''
+        documents = self.database.find(CONTENT_COLLECTION, {'content_type': content_type, 'src_url': src_url, 'ready_to_upload': True},
+                                       fields=['speech_blocks', 'original_language'], limit=1)
+        return BLOB_STORE.resolve(documents[0]) if documents else None
+
+    def list_resumable(self, content_type: str = None, limit=None):
+        '''Lists the unfinished content documents, most advanced first, with their content_type and last_completed_step'''
+        query = {'ready_to_upload': False}
+        if content_type:
+            query['content_type'] = content_type
+        return self.database.find(CONTENT_COLLECTION, query, fields=['content_type', 'last_completed_step'],
+                                  order_by=[('last_completed_step', True)], limit=limit)
@@ -1,3 +1,6 @@
+import json
+import os
+import sqlite3
 import threading
 from abc import ABC, abstractmethod
 
@@ -117,3 +120,247 @@ class TinyMongoDocument(AbstractDatabaseDocument):
         with self._lock:
             document = self.collection.find_one({'_id': self.document_id})
             return str(document)
+
+
+SQLITE_DATABASE_DIR = "./.database"
+# Seconds a connection waits for the write lock held by another thread or process before failing
+SQLITE_BUSY_TIMEOUT = 60
+
+
+def get_json_path(key):
+    '''Converts a dotted key to a JSON1 path, quoting each part so keys can contain spaces or dashes'''
+    parts = key.split(".") if key else []
+    return "$" + "".join('."' + part.replace('"', '\\"') + '"' for part in parts)
+
+
+def get_sql_string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def get_json_expression(key):
+    '''SQL expression of a dotted key of the data column, with the path as a literal so expression indexes can match it'''
+    return f"json_extract(data, {get_sql_string(get_json_path(key))})"
+
+
+def decode_json_value(value_type, value):
+    if value_type is None or value_type == 'null':
+        return None
+    if value_type == 'true':
+        return True
+    if value_type == 'false':
+        return False
+    if value_type in ('object', 'array'):
+        return json.loads(value)
+    return value
+
+
+class SQLiteDatabase:
+    '''
+    A SQLite file holding the documents of one database, one row per (collection, id) with the document as JSON.
+    Connections are opened in WAL mode, one per thread and per process. Writes take the database write lock
+    with BEGIN IMMEDIATE, so several processes can safely share the same database.
+    '''
+
+    def __init__(self, db_name: str, database_dir=SQLITE_DATABASE_DIR):
+        self.db_name = db_name
+        self.database_dir = database_dir
+        self.path = os.path.join(database_dir, f"{db_name}.sqlite3")
+        self._local = threading.local()
+        self._version_connection = None
+        self._version_pid = None
+        self._version_lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(self.database_dir, exist_ok=True)
+            # The busy timeout must be set before switching to WAL, which itself needs the lock
+            connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("""CREATE TABLE IF NOT EXISTS documents (
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                data TEXT NOT NULL DEFAULT '{}',
+                PRIMARY KEY (collection, id))""")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+            migrate_tinymongo_database(self, os.path.join(self.database_dir, f"{self.db_name}.json"))
+        return connection
+
+    def data_version(self):
+        '''
+        A number that changes when any thread or process commits to the database.
+        PRAGMA data_version values only compare within one connection, so it is read from a single connection
+        of the process, shared by its threads and never used for writes.
+        '''
+        with self._version_lock:
+            if self._version_connection is None or self._version_pid != os.getpid():
+                self.connection()
+                self._version_connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None,
+                                                           check_same_thread=False)
+                self._version_pid = os.getpid()
+            return self._version_connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def create_index(self, collection_name: str, index_name: str, keys):
+        '''Declares an index on the values of top level or dotted keys of a collection's documents'''
+        expressions = ", ".join(get_json_expression(key) for key in keys)
+        self.connection().execute(
+            f'CREATE INDEX IF NOT EXISTS "index_{collection_name}_{index_name}" ON documents (collection, {expressions})')
+
+    def find(self, collection_name: str, query: dict, fields=None, order_by=None, limit=None):
+        '''
+        Returns the documents of the collection whose keys equal the query values, like tinymongo's find.
+        The key paths are written literally in the SQL so that the indexes declared with create_index are used.
+        Only the given fields are read if fields is set, and order_by is a list of (key, descending) pairs.
+        '''
+        conditions = ["collection = ?"]
+        params = [collection_name]
+        for key, value in query.items():
+            conditions.append("id = ?" if key == '_id' else f"{get_json_expression(key)} = ?")
+            params.append(json.dumps(value) if isinstance(value, (dict, list)) else value)
+        if fields is None:
+            columns = "data"
+        else:
+            columns = ", ".join(f"json_type(data, {get_sql_string(get_json_path(field))}), {get_json_expression(field)}" for field in fields)
+        sql = f"SELECT id, {columns} FROM documents WHERE {' AND '.join(conditions)}"
+        if order_by:
+            sql += " ORDER BY " + ", ".join(f"{get_json_expression(key)} {'DESC' if descending else 'ASC'}" for key, descending in order_by)
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        documents = []
+        for row in self.connection().execute(sql, params):
+            if fields is None:
+                documents.append({'_id': row[0], **json.loads(row[1])})
+            else:
+                documents.append({'_id': row[0], **{field: decode_json_value(row[1 + 2 * i], row[2 + 2 * i]) for i, field in enumerate(fields)}})
+        return documents
+
+    def find_one(self, collection_name: str, query: dict):
+        '''Returns the first document of the collection whose keys equal the query values, or None'''
+        documents = self.find(collection_name, query, limit=1)
+        return documents[0] if documents else None
+
+
+_SQLITE_DATABASES = {}
+_sqlite_databases_lock = threading.Lock()
+
+
+def get_sqlite_database(db_name: str) -> SQLiteDatabase:
+    with _sqlite_databases_lock:
+        if db_name not in _SQLITE_DATABASES:
+            _SQLITE_DATABASES[db_name] = SQLiteDatabase(db_name)
+        return _SQLITE_DATABASES[db_name]
+
+
+def migrate_tinymongo_database(database: SQLiteDatabase, json_path):
+    '''One-shot import of a tinymongo JSON file ({collection: {n: {"_id": id, ...}}}) into a SQLite database'''
+    connection = database._local.connection
+    if connection.execute("SELECT 1 FROM meta WHERE key = 'tinymongo_migrated'").fetchone():
+        return
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        if not connection.execute("SELECT 1 FROM meta WHERE key = 'tinymongo_migrated'").fetchone():
+            if os.path.exists(json_path):
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                collections = json.loads(content) if content.strip() else {}
+                for collection_name, documents in collections.items():
+                    for document in documents.values():
+                        document = dict(document)
+                        document_id = document.pop('_id', None)
+                        if document_id is None:
+                            continue
+                        connection.execute("INSERT OR IGNORE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                                           (collection_name, str(document_id), json.dumps(document)))
+            connection.execute("INSERT INTO meta (key, value) VALUES ('tinymongo_migrated', ?)", (json_path,))
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+
+
+class SQLiteDocument(AbstractDatabaseDocument):
+
+    def __init__(self, db_name: str, collection_name: str, document_id: str, create=False):
+        self.database = get_sqlite_database(db_name)
+        self.collection_name = collection_name
+        self.document_id = document_id
+        if (not self.exists()):
+            if create:
+                self.database.connection().execute("INSERT OR IGNORE INTO documents (collection, id) VALUES (?, ?)",
+                                                   (collection_name, document_id))
+            else:
+                raise Exception(f"The document with id {document_id} in collection {collection_name} of database {db_name} does not exist")
+
+    def exists(self):
+        return self.database.connection().execute("SELECT 1 FROM documents WHERE collection = ? AND id = ?",
+                                                  (self.collection_name, self.document_id)).fetchone() is not None
+
+    def _save(self, data):
+        connection = self.database.connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for key, value in data.items():
+                    path, value = self.__get_update(connection, key, value)
+                    connection.execute("UPDATE documents SET data = json_set(data, ?, json(?)) WHERE collection = ? AND id = ?",
+                                       (path, json.dumps(value), self.collection_name, self.document_id))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+        except Exception as e:
+            print(f"Error saving data: {e}")
+
+    def __get_update(self, connection, key, value):
+        '''
+        json_set does not create missing parents. Returns the path of the deepest parent that is an object
+        (or the root) with the value nested in the missing keys, like tinymongo replaces a missing parent.
+        '''
+        parts = key.split(".")
+        if len(parts) == 1:
+            return get_json_path(key), value
+        parent_paths = [get_json_path(".".join(parts[:i])) for i in range(1, len(parts))]
+        parent_types = connection.execute(
+            f"SELECT {', '.join('json_type(data, ?)' for _ in parent_paths)} FROM documents WHERE collection = ? AND id = ?",
+            (*parent_paths, self.collection_name, self.document_id)).fetchone() or []
+        depth = 0
+        while depth < len(parent_types) and parent_types[depth] == 'object':
+            depth += 1
+        for part in reversed(parts[depth + 1:]):
+            value = {part: value}
+        return get_json_path(".".join(parts[:depth + 1])), value
+
+    def _get(self, key=None):
+        try:
+            if not key:
+                row = self.database.connection().execute("SELECT data FROM documents WHERE collection = ? AND id = ?",
+                                                         (self.collection_name, self.document_id)).fetchone()
+                return json.loads(row[0])
+            path = get_json_path(key)
+            row = self.database.connection().execute(
+                "SELECT json_type(data, ?), json_extract(data, ?) FROM documents WHERE collection = ? AND id = ?",
+                (path, path, self.collection_name, self.document_id)).fetchone()
+            return decode_json_value(*row)
+        except Exception as e:
+            return None
+
+    def _delete(self, key):
+        try:
+            path = get_json_path(key)
+            connection = self.database.connection()
+            cursor = connection.execute(
+                "UPDATE documents SET data = json_remove(data, ?) WHERE collection = ? AND id = ? AND json_type(data, ?) IS NOT NULL",
+                (path, self.collection_name, self.document_id, path))
+            if cursor.rowcount == 0:
+                print(f"Key '{key}' not found in the document")
+        except Exception as e:
+            print(f"Error deleting key '{key}': {e}")
+
+    def _getId(self):
+        return self.document_id
+
+    def __str__(self):
+        return str({'_id': self.document_id, **(self._get() or {})})
@@ -0,0 +1,131 @@
+import bisect
+import numbers
+
+import numpy as np
+from moviepy.editor import CompositeVideoClip, ImageClip
+
+
+class IntervalIndex:
+    """
+    Index of [start, end) intervals (end=None meaning open-ended), sorted on their boundaries.
+    For every span between two consecutive boundaries, the items active during it are precomputed in insertion order.
+    """
+
+    def __init__(self, intervals):
+        events = {}
+        for i, (start, end) in enumerate(intervals):
+            events.setdefault(start or 0, ([], []))[0].append(i)
+            if end is not None:
+                events.setdefault(end, ([], []))[1].append(i)
+        self.boundaries = sorted(events)
+        self.active_items = []
+        active = set()
+        for boundary in self.boundaries:
+            starting, ending = events[boundary]
+            active.difference_update(ending)
+            active.update(i for i in starting if intervals[i][1] is None or intervals[i][1] > boundary)
+            self.active_items.append(sorted(active))
+
+    def query(self, t):
+        span = bisect.bisect_right(self.boundaries, t) - 1
+        if span < 0:
+            return []
+        return self.active_items[span]
+
+
+class IndexedCompositeVideoClip(CompositeVideoClip):
+    """
+    CompositeVideoClip that looks up the clips playing at time t in an interval index of their start/end times,
+    instead of walking the whole clip list for every frame. Clips are still blitted in z order.
+    """
+
+    def __init__(self, clips, size=None, bg_color=None, use_bgclip=False, ismask=False):
+        super().__init__(clips, size=size, bg_color=bg_color, use_bgclip=use_bgclip, ismask=ismask)
+        self.clip_index = IntervalIndex([(c.start, c.end) for c in self.clips])
+        if isinstance(self.mask, CompositeVideoClip):
+            self.mask = IndexedCompositeVideoClip(self.mask.clips, self.size, ismask=True, bg_color=0.0)
+
+    def playing_clips(self, t=0):
+        if not isinstance(t, numbers.Number):
+            return super().playing_clips(t)
+        return [self.clips[i] for i in self.clip_index.query(t)]
+
+
+class StaticLayerClip(ImageClip):
+    """
+    Image layer made of several static clips, stored premultiplied with its alpha, so blending it on a frame
+    is a single multiply-add. Only the horizontal bands of the layer that have visible pixels are blended.
+    """
+
+    def __init__(self, premultiplied, alpha, position):
+        straight = np.divide(premultiplied, alpha[:, :, np.newaxis], out=np.zeros_like(premultiplied), where=alpha[:, :, np.newaxis] > 0)
+        super().__init__(np.clip(straight, 0, 255).astype(np.uint8))
+        self.mask = ImageClip(alpha, ismask=True)
+        self.pos = lambda t: position
+        x, y = position
+        self.tiles = []
+        for y0, y1 in get_visible_bands(alpha):
+            xs = np.nonzero(alpha[y0:y1].any(axis=0))[0]
+            x0, x1 = xs.min(), xs.max() + 1
+            self.tiles.append((int(x + x0), int(y + y0), premultiplied[y0:y1, x0:x1], (1 - alpha[y0:y1, x0:x1])[:, :, np.newaxis]))
+
+    def blit_on(self, picture, t):
+        if self.ismask:
+            return super().blit_on(picture, t)
+        picture = picture.copy()
+        for x, y, premultiplied, inverse_alpha in self.tiles:
+            height, width = inverse_alpha.shape[:2]
+            region = picture[y:y + height, x:x + width].astype(np.float32)
+            region *= inverse_alpha
+            region += premultiplied
+            picture[y:y + height, x:x + width] = region
+        return picture
+
+
+def get_visible_bands(alpha):
+    '''Returns the (start, end) row ranges of the runs of rows with visible pixels'''
+    visible_rows = np.concatenate(([False], alpha.any(axis=1), [False]))
+    edges = np.flatnonzero(visible_rows[1:] != visible_rows[:-1])
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def is_static_clip(clip):
+    '''True for image and text clips shown from the start to the end of the video at a fixed position'''
+    return isinstance(clip, ImageClip) and not clip.start and clip.end is None
+
+
+def rasterize_static_layer(clips, size):
+    '''Blends clips once over a transparent canvas and crops the result to its visible bounding box'''
+    width, height = size
+    # Blending over black gives premultiplied colors, and blending white copies of the clips gives their coverage.
+    # moviepy's composite mask is not used since it ignores relative positions
+    premultiplied = np.zeros((height, width, 3))
+    coverage = np.zeros((height, width, 3))
+    for clip in clips:
+        premultiplied = clip.blit_on(premultiplied, 0)
+        coverage = clip.fl_image(lambda frame: np.full_like(frame, 255)).blit_on(coverage, 0)
+    premultiplied = premultiplied.astype(np.float32)
+    alpha = (coverage[:, :, 0] / 255).astype(np.float32)
+    ys, xs = np.nonzero(alpha)
+    if not len(ys):
+        return None
+    y0, y1, x0, x1 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+    return StaticLayerClip(premultiplied[y0:y1, x0:x1], alpha[y0:y1, x0:x1], (int(x0), int(y0)))
+
+
+def flatten_static_clips(clips, size):
+    '''Replaces each run of consecutive (in z order) static clips with one StaticLayerClip'''
+    flattened_clips = []
+    static_run = []
+    for clip in clips + [None]:
+        if clip is not None and is_static_clip(clip):
+            static_run.append(clip)
+            continue
+        if static_run:
+            layer = rasterize_static_layer(static_run, size)
+            if layer is not None:
+                flattened_clips.append(layer)
+            static_run = []
+        if clip is not None:
+            flattened_clips.append(clip)
+    return flattened_clips
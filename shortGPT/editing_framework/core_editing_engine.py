@@ -6,20 +6,62 @@ if magick_path:
 from shortGPT.config.path_utils import handle_path
 import numpy as np
 import json
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Any, Dict, List, Union
 from moviepy.editor import (AudioFileClip, CompositeVideoClip,CompositeAudioClip, ImageClip,
                             TextClip, VideoFileClip, vfx,)
 from moviepy.audio.fx.audio_loop import audio_loop
 from moviepy.audio.fx.audio_normalize import audio_normalize
+from shortGPT.editing_framework.compositor import (IndexedCompositeVideoClip,
+                                                   flatten_static_clips)
+from shortGPT.editing_framework.image_ops import load_image_clip, to_rgb_frame
+from shortGPT.editing_framework.prepared_assets import (get_prepared_video,
+                                                       split_pixel_actions)
 from shortGPT.editing_framework.rendering_logger import MoviepyProgressLogger
+from shortGPT.editing_framework.text_rasterizer import (prerender_text_assets,
+                                                        rasterize_text_parameters)
+
+RENDER_FPS = 25
+MIN_SLICE_DURATION = 2
 
 def load_schema(json_path):
     return json.loads(open(json_path, 'r', encoding='utf-8').read())
 
+def get_asset_time_range(asset: Dict[str, Any]):
+    start, end = 0, None
+    for action in asset['actions']:
+        if action['type'] == 'set_time_start' and action['param'] is not None:
+            start = action['param']
+        if action['type'] == 'set_time_end' and action['param'] is not None:
+            end = action['param']
+    return start, end
+
+def render_video_slice(schema: Dict[str, Any], first_frame, last_frame, duration, output_file):
+    """Renders the frames [first_frame, last_frame) of the schema without audio, in a worker process"""
+    t_start, t_end = first_frame / RENDER_FPS, last_frame / RENDER_FPS
+    # Only the assets visible during the slice are loaded. The lowest asset is kept as it sets the video size.
+    visual_assets = sorted(schema['visual_assets'].items(), key=lambda item: item[1]['z'])
+    slice_assets = {}
+    for i, (asset_key, asset) in enumerate(visual_assets):
+        start, end = get_asset_time_range(asset)
+        if i == 0 or (start < t_end and (end is None or end > t_start)):
+            slice_assets[asset_key] = asset
+    video = CoreEditingEngine().build_video_clip({'visual_assets': slice_assets, 'audio_assets': {}}, with_audio=False)
+    video.duration = duration
+    # Half a frame before the next slice, so that moviepy writes exactly last_frame - first_frame frames
+    slice_clip = video.subclip(t_start, min((last_frame - 0.5) / RENDER_FPS, duration))
+    slice_clip.write_videofile(output_file, codec='libx264', fps=RENDER_FPS, preset='veryfast', audio=False, logger=None)
+    video.close()
+    return output_file
+
 class CoreEditingEngine:
 
     def generate_image(self, schema:Dict[str, Any],output_file , logger=None):
         assets = dict(sorted(schema['visual_assets'].items(), key=lambda item: item[1]['z']))
+        prerender_text_assets(list(assets.values()))
         clips = []
 
         for asset_key in assets:
@@ -42,9 +84,69 @@ class CoreEditingEngine:
         return output_file
 
     def generate_video(self, schema:Dict[str, Any], output_file, logger=None) -> None:
+        video = self.build_video_clip(schema)
+        if logger:
+            my_logger = MoviepyProgressLogger(callBackFunction=logger)
+            video.write_videofile(output_file, codec='libx264', audio_codec='aac', fps=25, preset='veryfast', logger=my_logger)
+        else:
+            video.write_videofile(output_file, codec='libx264', audio_codec='aac', fps=25, preset='veryfast')
+        return output_file
+
+    def generate_video_parallel(self, schema:Dict[str, Any], output_file, n_slices=None, logger=None) -> None:
+        """
+        Renders the timeline as N time slices in a process pool, each slice being composited from the same schema.
+        The audio is mixed once for the whole timeline, from the audio assets or else from the video clips,
+        and the slices are joined by the concat demuxer without re-encoding.
+        """
+        audio = self.build_audio_clip(schema)
+        video = None
+        if audio:
+            duration = audio.duration
+        else:
+            # Without audio assets, the audio of the video clips is kept, as generate_video does
+            video = self.build_video_clip(schema, with_audio=False)
+            duration = video.duration
+            if video.audio:
+                audio = video.audio.set_duration(duration)
+        total_frames = int(np.ceil(duration * RENDER_FPS - 1e-6))
+        n_slices = n_slices or os.cpu_count() or 1
+        n_slices = max(1, min(n_slices, int(duration // MIN_SLICE_DURATION)))
+        frame_bounds = [round(i * total_frames / n_slices) for i in range(n_slices + 1)]
+
+        work_dir = tempfile.mkdtemp(prefix="shortgpt_slices_")
+        try:
+            slice_files = [os.path.join(work_dir, f"slice_{i}.mp4") for i in range(n_slices)]
+            with ProcessPoolExecutor(max_workers=n_slices) as executor:
+                futures = [executor.submit(render_video_slice, schema, frame_bounds[i], frame_bounds[i+1], duration, slice_files[i])
+                           for i in range(n_slices)]
+                audio_file = None
+                if audio:
+                    audio_file = os.path.join(work_dir, "audio.m4a")
+                    audio.write_audiofile(audio_file, fps=44100, codec='aac', logger=None)
+                progress_logger = MoviepyProgressLogger(callBackFunction=logger) if logger else None
+                for i, future in enumerate(as_completed(futures)):
+                    future.result()
+                    if progress_logger:
+                        progress_logger.report_progress(i + 1, n_slices)
+
+            concat_list = os.path.join(work_dir, "slices.txt")
+            with open(concat_list, 'w', encoding='utf-8') as f:
+                f.writelines(f"file '{slice_file}'\n" for slice_file in slice_files)
+            command = ['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0', '-i', concat_list]
+            if audio_file:
+                command += ['-i', audio_file, '-map', '0:v', '-map', '1:a']
+            command += ['-c', 'copy', output_file]
+            subprocess.run(command, check=True)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            if video:
+                video.close()
+        return output_file
+
+    def build_video_clip(self, schema:Dict[str, Any], with_audio=True) -> CompositeVideoClip:
         visual_assets = dict(sorted(schema['visual_assets'].items(), key=lambda item: item[1]['z']))
-        audio_assets = dict(sorted(schema['audio_assets'].items(), key=lambda item: item[1]['z']))
-        
+        prerender_text_assets(list(visual_assets.values()))
+
         visual_clips = []
         for asset_key in visual_assets:
             asset = visual_assets[asset_key]
@@ -62,31 +164,16 @@ class CoreEditingEngine:
                 raise ValueError(f'Invalid asset type: {asset_type}')
 
             visual_clips.append(clip)
-        
-        audio_clips = []
-
-        for asset_key in audio_assets:
-            asset = audio_assets[asset_key]
-            asset_type = asset['type']
-            if asset_type == "audio":
-                audio_clip = self.process_audio_asset(asset)
-            else:
-                raise ValueError(f"Invalid asset type: {asset_type}")
 
-            audio_clips.append(audio_clip)
-        video = CompositeVideoClip(visual_clips)
-        if(audio_clips):
-            audio = CompositeAudioClip(audio_clips)
+        size = visual_clips[0].size
+        video = IndexedCompositeVideoClip(flatten_static_clips(visual_clips, size), size=size)
+        audio = self.build_audio_clip(schema) if with_audio else None
+        if(audio):
             video.duration = audio.duration
             video.audio = audio
-        if logger:
-            my_logger = MoviepyProgressLogger(callBackFunction=logger)
-            video.write_videofile(output_file, codec='libx264', audio_codec='aac', fps=25, preset='veryfast', logger=my_logger)
-        else:
-            video.write_videofile(output_file, codec='libx264', audio_codec='aac', fps=25, preset='veryfast')
-        return output_file
-    
-    def generate_audio(self, schema:Dict[str, Any], output_file, logger=None) -> None:
+        return video
+
+    def build_audio_clip(self, schema:Dict[str, Any]) -> CompositeAudioClip:
         audio_assets = dict(sorted(schema['audio_assets'].items(), key=lambda item: item[1]['z']))
         audio_clips = []
 
@@ -99,7 +186,12 @@ class CoreEditingEngine:
                 raise ValueError(f"Invalid asset type: {asset_type}")
 
             audio_clips.append(audio_clip)
-        audio = CompositeAudioClip(audio_clips)
+        if not audio_clips:
+            return None
+        return CompositeAudioClip(audio_clips)
+
+    def generate_audio(self, schema:Dict[str, Any], output_file, logger=None) -> None:
+        audio = self.build_audio_clip(schema)
         audio.fps = 44100
         if logger:
             my_logger = MoviepyProgressLogger(callBackFunction=logger)
@@ -154,7 +246,7 @@ class CoreEditingEngine:
                 continue
 
             if action['type'] == 'normalize_image':
-                clip = clip.fx(self.__normalize_image)
+                clip = clip.fl_image(to_rgb_frame)
                 continue
 
             if action['type'] == 'auto_resize_image':
@@ -197,55 +289,36 @@ class CoreEditingEngine:
         }
         if 'audio' in asset['parameters']:
             params['audio'] = asset['parameters']['audio']
+        if not params.get('audio', True) and any(action['type'] == 'green_screen' for action in asset['actions']):
+            # Chroma keyed videos (like the subscribe animation) are identical in every render, they are keyed once and reused
+            pixel_actions, other_actions = split_pixel_actions(asset['actions'])
+            clip = get_prepared_video(asset['parameters']['url'], pixel_actions,
+                                      lambda: self.process_common_visual_actions(VideoFileClip(**params), pixel_actions))
+            return self.process_common_visual_actions(clip, other_actions)
         clip = VideoFileClip(**params)
         return self.process_common_visual_actions(clip, asset['actions'])
 
     def process_image_asset(self, asset: Dict[str, Any]) -> ImageClip:
-        clip = ImageClip(asset['parameters']['url'])
+        clip = load_image_clip(asset['parameters']['url'])
         return self.process_common_visual_actions(clip, asset['actions'])
 
     def process_text_asset(self, asset: Dict[str, Any]) -> TextClip:
+        clip = self.make_text_clip(asset)
+        return self.process_common_visual_actions(clip, asset['actions'])
+
+    def make_text_clip(self, asset: Dict[str, Any]) -> Union[ImageClip, TextClip]:
         text_clip_params = asset['parameters']
         
         if not (any(key in text_clip_params for key in ['text','fontsize', 'size'])):
             raise Exception('You must include at least a size or a fontsize to determine the size of your text')
+        text_frame = rasterize_text_parameters(text_clip_params)
+        if text_frame is not None:
+            return ImageClip(text_frame)
+        # ImageMagick is only needed for fonts Pillow cannot find
         text_clip_params['txt'] = text_clip_params['text']
         clip_info = {k: text_clip_params[k] for k in ('txt', 'fontsize', 'font', 'color', 'stroke_width', 'stroke_color', 'size', 'kerning', 'method', 'align') if k in text_clip_params}
-        clip = TextClip(**clip_info)
-
-        return self.process_common_visual_actions(clip, asset['actions'])
+        return TextClip(**clip_info)
 
     def process_audio_asset(self, asset: Dict[str, Any]) -> AudioFileClip:
         clip = AudioFileClip(asset['parameters']['url'])
         return self.process_audio_actions(clip, asset['actions'])
-    
-    def __normalize_image(self, clip):
-        def f(get_frame, t):
-            if f.normalized_frame is not None:
-                return f.normalized_frame
-            else:
-                frame = get_frame(t)
-                f.normalized_frame = self.__normalize_frame(frame)
-                return f.normalized_frame
-
-        f.normalized_frame = None
-
-        return clip.fl(f)
-
-
-    def __normalize_frame(self, frame):
-        shape = np.shape(frame)
-        [dimensions, ] = np.shape(shape)
-
-        if dimensions == 2:
-            (height, width) = shape
-            normalized_frame = np.zeros((height, width, 3))
-            for y in range(height):
-                for x in range(width):
-                    grey_value = frame[y][x]
-                    normalized_frame[y][x] = (grey_value, grey_value, grey_value)
-            return normalized_frame
-        else:
-            return frame
-        
-
@@ -1,18 +1,11 @@
-import json
 from typing import Any, Dict, List, Union
 from enum import Enum
-import collections.abc
+from functools import lru_cache
 
 from shortGPT.editing_framework.core_editing_engine import CoreEditingEngine
-
-def update_dict(d, u):
-    for k, v in u.items():
-        if isinstance(v, collections.abc.Mapping):
-            d[k] = update_dict(d.get(k, {}), v)
-        else:
-            d[k] = v
-    return d
-
+from shortGPT.editing_framework.ffmpeg_editing_engine import FFmpegEditingEngine
+from shortGPT.editing_framework.render_cache import RenderCache
+from shortGPT.editing_framework.template_registry import load_templates
 
 class EditingStep(Enum):
     CROP_1920x1080 = "crop_1920x1080_to_short.json"
@@ -34,73 +27,64 @@ class EditingStep(Enum):
 class Flow(Enum):
     WHITE_REDDIT_IMAGE_FLOW = "build_reddit_image.json"
 
+class RenderBackend(Enum):
+    MOVIEPY = "moviepy"
+    MOVIEPY_PARALLEL = "moviepy_parallel"
+    FFMPEG = "ffmpeg"
+
 from pathlib import Path
 
 _here = Path(__file__).parent
 STEPS_PATH = (_here / 'editing_steps/').resolve()
 FLOWS_PATH = (_here / 'flows/').resolve()
 
+@lru_cache(maxsize=None)
+def get_templates():
+    return load_templates(EditingStep, STEPS_PATH, Flow, FLOWS_PATH)
+
 class EditingEngine:
     def __init__(self,):
         self.editing_step_tracker = dict((step, 0) for step in EditingStep)
         self.schema = {'visual_assets': {}, 'audio_assets': {}}
 
     def addEditingStep(self, editingStep: EditingStep, args: Dict[str, any] = {}):
-        json_step = json.loads(
-            open(STEPS_PATH / f"{editingStep.value}", 'r', encoding='utf-8').read())
-        step_name, editingStepDict = list(json_step.items())[0]
-        if 'inputs' in editingStepDict:
-            required_args = (editingStepDict['inputs']['actions'] if 'actions' in editingStepDict['inputs'] else []) + (editingStepDict['inputs']['parameters'] if 'parameters' in editingStepDict['inputs'] else [])
-            for required_argument in required_args:
-                if required_argument not in args:
-                    raise Exception(
-                        f"Error. '{required_argument}' input missing, you must include it to use this editing step")
-            if required_args:
-                pass
-            action_names = [action['type'] for action in editingStepDict['actions']
-                            ] if 'actions' in editingStepDict else []
-            param_names = [param_name for param_name in editingStepDict['parameters']
-                           ] if 'parameters' in editingStepDict else []
-            for arg_name in args:
-                if ('inputs' in editingStepDict):
-                    if 'parameters' in editingStepDict['inputs'] and arg_name in param_names:
-                        editingStepDict['parameters'][arg_name] = args[arg_name]
-                        pass
-                    if 'actions' in editingStepDict['inputs'] and arg_name in action_names:
-                        for i, action in enumerate(editingStepDict['actions']):
-                            if action['type'] == arg_name:
-                                editingStepDict['actions'][i]['param'] = args[arg_name]
-        if editingStepDict['type'] == 'audio':
-            self.schema['audio_assets'][f"{step_name}_{self.editing_step_tracker[editingStep]}"] = editingStepDict
+        step_template = get_templates()[editingStep]
+        editingStepDict = step_template.instantiate(args)
+        if step_template.type == 'audio':
+            self.schema['audio_assets'][f"{step_template.name}_{self.editing_step_tracker[editingStep]}"] = editingStepDict
         else:
-            self.schema['visual_assets'][f"{step_name}_{self.editing_step_tracker[editingStep]}"] = editingStepDict
+            self.schema['visual_assets'][f"{step_template.name}_{self.editing_step_tracker[editingStep]}"] = editingStepDict
         self.editing_step_tracker[editingStep] += 1
 
-
     def ingestFlow(self, flow: Flow, args):
-        json_flow = json.loads(open(FLOWS_PATH / f"{flow.value}", 'r', encoding='utf-8').read())
-        for required_argument in list(json_flow['inputs'].keys()):
-                if required_argument not in args:
-                    raise Exception(
-                        f"Error. '{required_argument}' input missing, you must include it to use this editing step")
-                update = args[required_argument]
-                for path_key in reversed(json_flow['inputs'][required_argument].split("/")):
-                    update = {path_key: update}
-                json_flow = update_dict(json_flow, update)
-        self.schema = json_flow
+        self.schema = get_templates()[flow].instantiate(args)
 
     def dumpEditingSchema(self):
         return self.schema
     
-    def renderVideo(self, outputPath, logger=None):
-        engine = CoreEditingEngine()
-        engine.generate_video(self.schema, outputPath, logger=logger)
-    def renderImage(self, outputPath, logger=None):
+    def renderVideo(self, outputPath, logger=None, backend: RenderBackend = RenderBackend.MOVIEPY, use_cache=True):
+        def render(path):
+            if backend == RenderBackend.MOVIEPY_PARALLEL:
+                CoreEditingEngine().generate_video_parallel(self.schema, path, logger=logger)
+                return
+            # The ffmpeg engine renders schemas it cannot compile with moviepy
+            engine = FFmpegEditingEngine() if backend == RenderBackend.FFMPEG else CoreEditingEngine()
+            engine.generate_video(self.schema, path, logger=logger)
+        self.__render(outputPath, render, 'video', use_cache)
+
+    def renderImage(self, outputPath, logger=None, use_cache=True):
         engine = CoreEditingEngine()
-        engine.generate_image(self.schema, outputPath, logger=logger)
-    def generateAudio(self, outputPath, logger=None):
+        self.__render(outputPath, lambda path: engine.generate_image(self.schema, path, logger=logger), 'image', use_cache)
+
+    def generateAudio(self, outputPath, logger=None, use_cache=True):
         engine = CoreEditingEngine()
-        engine.generate_audio(self.schema, outputPath, logger=logger)
+        self.__render(outputPath, lambda path: engine.generate_audio(self.schema, path, logger=logger), 'audio', use_cache)
+
+    def __render(self, outputPath, render_function, kind, use_cache):
+        if use_cache:
+            RenderCache().render(self.schema, outputPath, render_function, kind)
+        else:
+            render_function(outputPath)
 
 
 
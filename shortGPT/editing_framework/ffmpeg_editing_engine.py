@@ -0,0 +1,326 @@
+import os
+import shutil
+import subprocess
+import tempfile
+from typing import Any, Dict, List
+
+from shortGPT.config.path_utils import handle_path
+from shortGPT.editing_framework.core_editing_engine import CoreEditingEngine
+from shortGPT.editing_framework.rendering_logger import FFmpegProgressLogger
+from shortGPT.editing_framework.text_rasterizer import prerender_text_assets
+from shortGPT.editing_utils.media_probe import get_media_info
+
+FPS = 25
+SUPPORTED_VISUAL_ACTIONS = {'set_time_start', 'set_time_end', 'subclip', 'crop', 'resize', 'screen_position',
+                            'green_screen', 'normalize_image', 'auto_resize_image'}
+# 'normalize_audio' is declared by background_music.json but ignored by the moviepy backend as well
+SUPPORTED_AUDIO_ACTIONS = {'set_time_start', 'set_time_end', 'subclip', 'volume_percentage',
+                           'loop_background_music', 'normalize_audio'}
+MAX_RGB_DISTANCE = 255 * 3 ** 0.5
+
+
+def get_layer_media_info(url):
+    """Size and duration of a visual or audio asset from the cached media probe, or None if it cannot be probed"""
+    try:
+        info = get_media_info(url)
+    except Exception:
+        return None
+    width, height = info.get('width'), info.get('height')
+    return {
+        'size': [int(width), int(height)] if width and height else None,
+        'duration': info.get('duration'),
+    }
+
+
+class FFmpegEditingEngine(CoreEditingEngine):
+    """
+    Renders editing schemas with a single ffmpeg filter_complex invocation instead of compositing
+    every frame through moviepy. Schemas using actions that cannot be expressed as ffmpeg filters
+    are rendered by the moviepy implementation of CoreEditingEngine.
+    """
+
+    def supports_schema(self, schema: Dict[str, Any]) -> bool:
+        if not schema['visual_assets']:
+            return False
+        for asset in schema['visual_assets'].values():
+            if asset['type'] not in ('video', 'image', 'text'):
+                return False
+            if any(action['type'] not in SUPPORTED_VISUAL_ACTIONS for action in asset['actions']):
+                return False
+            # Without audio assets, moviepy would mix the audio tracks of the videos
+            if asset['type'] == 'video' and asset['parameters'].get('audio', True) and not schema['audio_assets']:
+                return False
+        for asset in schema['audio_assets'].values():
+            if asset['type'] != 'audio':
+                return False
+            if any(action['type'] not in SUPPORTED_AUDIO_ACTIONS for action in asset['actions']):
+                return False
+        return True
+
+    def generate_video(self, schema: Dict[str, Any], output_file, logger=None) -> None:
+        if not self.supports_schema(schema):
+            return super().generate_video(schema, output_file, logger=logger)
+        work_dir = tempfile.mkdtemp(prefix="shortgpt_ffmpeg_")
+        try:
+            command, duration = self.build_command(schema, output_file, work_dir)
+            self.run_command(command, duration, logger)
+        except Exception as e:
+            print("Failed rendering the video with ffmpeg, falling back to moviepy", e)
+            return super().generate_video(schema, output_file, logger=logger)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return output_file
+
+    def build_command(self, schema: Dict[str, Any], output_file, work_dir):
+        visual_assets = dict(sorted(schema['visual_assets'].items(), key=lambda item: item[1]['z']))
+        audio_assets = dict(sorted(schema['audio_assets'].items(), key=lambda item: item[1]['z']))
+        prerender_text_assets(list(visual_assets.values()))
+        inputs = []
+        filters = []
+
+        layers = []
+        for asset_key in visual_assets:
+            layer = self.compile_visual_asset(visual_assets[asset_key], len(inputs), work_dir)
+            if layer is None:
+                continue
+            inputs.append(layer['input'])
+            filters.append(f"[{len(inputs) - 1}:v]{','.join(layer['filters'])}[v{len(layers)}]")
+            layers.append(layer)
+
+        audio_labels = []
+        audio_ends = []
+        for asset_key in audio_assets:
+            track = self.compile_audio_asset(audio_assets[asset_key])
+            inputs.append(track['input'])
+            filters.append(f"[{len(inputs) - 1}:a]{','.join(track['filters'])}[a{len(audio_labels)}]")
+            audio_labels.append(f"[a{len(audio_labels)}]")
+            audio_ends.append(track['end'])
+
+        if not layers:
+            raise Exception("No visual asset could be loaded")
+        if audio_ends:
+            duration = max(audio_ends)
+        else:
+            visual_ends = [layer['end'] for layer in layers]
+            if None in visual_ends:
+                raise Exception("The duration of the video could not be determined")
+            duration = max(visual_ends)
+
+        width, height = layers[0]['size']
+        filters.append(f"color=c=black:s={width}x{height}:r={FPS}:d={duration}[base0]")
+        for i, layer in enumerate(layers):
+            x, y = self.resolve_position(layer, (width, height))
+            filters.append(f"[base{i}][v{i}]overlay=x={x}:y={y}:eof_action=pass[base{i + 1}]")
+        # libx264 only accepts yuv420p for even frame sizes, as in moviepy's writer
+        pixel_format = ",format=yuv420p" if width % 2 == 0 and height % 2 == 0 else ""
+        filters.append(f"[base{len(layers)}]null{pixel_format}[vout]")
+        if audio_labels:
+            filters.append(f"{''.join(audio_labels)}amix=inputs={len(audio_labels)}:duration=longest:normalize=0[aout]")
+
+        # The filter graph grows with the number of captions, a script file avoids command line length limits
+        script_path = os.path.join(work_dir, "filter_complex.txt")
+        with open(script_path, 'w', encoding='utf-8') as f:
+            f.write(";\n".join(filters))
+
+        command = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-nostats']
+        for input_args in inputs:
+            command += input_args
+        command += ['-filter_complex_script', script_path, '-map', '[vout]']
+        if audio_labels:
+            command += ['-map', '[aout]', '-c:a', 'aac', '-ar', '44100']
+        command += ['-c:v', 'libx264', '-preset', 'veryfast', '-r', str(FPS), '-t', str(duration),
+                    '-progress', 'pipe:1', output_file]
+        return command, duration
+
+    def run_command(self, command: List[str], duration: float, logger=None):
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if logger:
+            FFmpegProgressLogger(duration * FPS, callBackFunction=logger).read_progress(process.stdout)
+        _, stderr = process.communicate()
+        if process.returncode != 0:
+            raise Exception(f"ffmpeg exited with code {process.returncode}. {stderr.strip()}")
+
+    def compile_visual_asset(self, asset: Dict[str, Any], input_index: int, work_dir) -> Dict[str, Any]:
+        asset_type = asset['type']
+        natural_duration = None
+        if asset_type == 'video':
+            url = handle_path(asset['parameters']['url'])
+            metadata = get_layer_media_info(url)
+            if not metadata or not metadata['size']:
+                raise Exception(f"Could not read the size of the video {url}")
+            size, natural_duration = metadata['size'], metadata['duration']
+            input_args = ['-i', url]
+        elif asset_type == 'image':
+            url = asset['parameters']['url']
+            metadata = get_layer_media_info(url)
+            if not metadata or not metadata['size']:
+                # The moviepy backend skips images that cannot be loaded
+                return None
+            size = metadata['size']
+            input_args = ['-i', url]
+        else:
+            url = os.path.join(work_dir, f"text_{input_index}.png")
+            clip = self.make_text_clip(asset)
+            clip.save_frame(url, withmask=True)
+            size = list(clip.size)
+            clip.close()
+            input_args = ['-i', url]
+
+        start, duration, offset = self.compile_timing(asset['actions'], natural_duration)
+        if asset_type == 'video':
+            trim = f"trim=start={offset}" + (f":duration={duration}" if duration is not None else "")
+            filters = [trim, f"setpts=PTS-STARTPTS+{start}/TB"]
+        else:
+            # Still images are decoded once and repeated by the loop filter
+            filters = ['format=rgba', 'loop=loop=-1:size=1:start=0', f"setpts=N/{FPS}/TB"]
+            if duration is not None:
+                filters.append(f"trim=duration={duration}")
+            filters.append(f"setpts=PTS+{start}/TB")
+
+        position = None
+        for action in asset['actions']:
+            if action['type'] == 'resize':
+                size = self.resized_size(size, **action['param'])
+                filters.append(f"scale={size[0]}:{size[1]}")
+            elif action['type'] == 'crop':
+                size, (x, y) = self.cropped_area(size, **action['param'])
+                filters.append(f"crop={size[0]}:{size[1]}:{x}:{y}")
+            elif action['type'] == 'auto_resize_image':
+                ar = size[0] / size[1]
+                height = action['param']['maxHeight']
+                width = action['param']['maxWidth']
+                size = self.resized_size(size, newsize=(height * ar, height) if ar < 1 else (width, width / ar))
+                filters.append(f"scale={size[0]}:{size[1]}")
+            elif action['type'] == 'screen_position':
+                position = action['param']
+            elif action['type'] == 'green_screen':
+                filters += ['format=rgba', self.colorkey_filter(action['param'])]
+            elif action['type'] == 'normalize_image':
+                filters.append('format=rgba')
+
+        return {
+            'input': input_args,
+            'filters': filters,
+            'size': size,
+            'position': position,
+            'end': start + duration if duration is not None else None,
+        }
+
+    def compile_audio_asset(self, asset: Dict[str, Any]) -> Dict[str, Any]:
+        url = asset['parameters']['url']
+        metadata = get_layer_media_info(url)
+        natural_duration = metadata['duration'] if metadata else None
+        if natural_duration is None:
+            raise Exception(f"Could not read the duration of the audio {url}")
+        start, duration, offset = self.compile_timing(asset['actions'], natural_duration)
+
+        loop_duration = None
+        volume = 1
+        for action in asset['actions']:
+            if action['type'] == 'loop_background_music':
+                loop_start = duration * 0.15
+                offset += loop_start
+                duration -= loop_start
+                loop_duration = action['param']
+            elif action['type'] == 'volume_percentage':
+                volume *= action['param']
+
+        filters = [f"atrim=start={offset}:duration={duration}", "asetpts=PTS-STARTPTS"]
+        if loop_duration is not None:
+            # aloop repeats whatever it buffered once the input ends, so the size only needs to be large enough
+            filters += ["aloop=loop=-1:size=2147483647", f"atrim=duration={loop_duration}"]
+            duration = loop_duration
+        if volume != 1:
+            filters.append(f"volume={volume}")
+        if start:
+            filters.append(f"adelay=delays={int(round(start * 1000))}:all=1")
+        return {
+            'input': ['-i', url],
+            'filters': filters,
+            'end': start + duration,
+        }
+
+    def compile_timing(self, actions: List[Dict[str, Any]], duration):
+        """Replays the moviepy semantics of set_start / set_end / subclip, returns (start, duration, source offset)"""
+        start, offset = 0, 0
+        for action in actions:
+            if action['type'] == 'set_time_start':
+                start = action['param']
+            elif action['type'] == 'set_time_end':
+                duration = action['param'] - start
+            elif action['type'] == 'subclip':
+                t_start = action['param'].get('t_start', 0)
+                t_end = action['param'].get('t_end')
+                if t_end is None:
+                    t_end = duration
+                elif t_end < 0 and duration is not None:
+                    t_end = duration + t_end
+                offset += t_start
+                duration = t_end - t_start if t_end is not None else None
+        return start, duration, offset
+
+    def resized_size(self, size, newsize=None, height=None, width=None, apply_to_mask=True):
+        w, h = size
+        if newsize is not None:
+            if isinstance(newsize, (int, float)):
+                newsize = [newsize * w, newsize * h]
+        elif height is not None:
+            newsize = [w * height / h, height]
+        elif width is not None:
+            newsize = [width, h * width / w]
+        return [int(newsize[0]), int(newsize[1])]
+
+    def cropped_area(self, size, x1=None, y1=None, x2=None, y2=None, width=None, height=None, x_center=None, y_center=None):
+        if width and x1 is not None:
+            x2 = x1 + width
+        elif width and x2 is not None:
+            x1 = x2 - width
+        if height and y1 is not None:
+            y2 = y1 + height
+        elif height and y2 is not None:
+            y1 = y2 - height
+        if x_center:
+            x1, x2 = x_center - width / 2, x_center + width / 2
+        if y_center:
+            y1, y2 = y_center - height / 2, y_center + height / 2
+        x1 = int(x1 or 0)
+        y1 = int(y1 or 0)
+        # numpy slicing clamps the crop to the frame
+        x2 = min(int(x2 or size[0]), size[0])
+        y2 = min(int(y2 or size[1]), size[1])
+        return [x2 - x1, y2 - y1], (x1, y1)
+
+    def resolve_position(self, layer: Dict[str, Any], frame_size):
+        wf, hf = frame_size
+        wi, hi = layer['size']
+        if layer['position'] is None:
+            return 0, 0
+        pos = layer['position']['pos']
+        if isinstance(pos, str):
+            pos = {'center': ['center', 'center'],
+                   'left': ['left', 'center'],
+                   'right': ['right', 'center'],
+                   'top': ['center', 'top'],
+                   'bottom': ['center', 'bottom']}[pos]
+        else:
+            pos = list(pos)
+        if layer['position'].get('relative'):
+            for i, dim in enumerate([wf, hf]):
+                if not isinstance(pos[i], str):
+                    pos[i] = dim * pos[i]
+        if isinstance(pos[0], str):
+            pos[0] = {'left': 0, 'center': (wf - wi) / 2, 'right': wf - wi}[pos[0]]
+        if isinstance(pos[1], str):
+            pos[1] = {'top': 0, 'center': (hf - hi) / 2, 'bottom': hf - hi}[pos[1]]
+        return int(pos[0]), int(pos[1])
+
+    def colorkey_filter(self, params: Dict[str, Any]) -> str:
+        color = params['color'] if params['color'] else [52, 255, 20]
+        thr = params['thr'] if params['thr'] else 100
+        s = params['s'] if params['s'] else 5
+        # moviepy's mask_color is the hill function d**s / (thr**s + d**s) of the RGB distance d.
+        # colorkey ramps linearly instead, so the ramp is centered on thr with the slope of the hill at thr.
+        blend = min(4 * thr / (s * MAX_RGB_DISTANCE), 1)
+        similarity = max(thr / MAX_RGB_DISTANCE - blend / 2, 0.01)
+        hex_color = ''.join(f"{int(c):02X}" for c in color)
+        return f"colorkey=color=0x{hex_color}:similarity={similarity:.4f}:blend={blend:.4f}"
@@ -0,0 +1,55 @@
+import imageio.v2 as imageio
+import numpy as np
+from moviepy.editor import ImageClip
+
+
+def to_uint8(frame, max_value=255):
+    '''
+    Converts a frame to uint8. max_value is the value of full intensity of float frames, given by the caller:
+    1 for masks and float images, 255 for moviepy frames
+    '''
+    frame = np.asarray(frame)
+    if frame.dtype == np.uint8:
+        return frame
+    if frame.dtype == bool:
+        return frame.astype(np.uint8) * 255
+    if np.issubdtype(frame.dtype, np.floating) and max_value != 255:
+        frame = frame * (255 / max_value)
+    elif frame.dtype == np.uint16:
+        frame = frame >> 8
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def normalize_frame(frame, max_value=255):
+    '''Converts a grayscale, grayscale+alpha, RGB or RGBA frame to a uint8 RGB or RGBA frame. See to_uint8 for max_value'''
+    frame = to_uint8(frame, max_value)
+    if frame.ndim == 2:
+        frame = frame[:, :, np.newaxis]
+    channels = frame.shape[2]
+    if channels == 1:
+        return np.repeat(frame, 3, axis=2)
+    if channels == 2:
+        return np.concatenate((np.repeat(frame[:, :, :1], 3, axis=2), frame[:, :, 1:]), axis=2)
+    return frame[:, :, :4]
+
+
+def to_rgb_frame(frame, max_value=255):
+    '''Same as normalize_frame, dropping the alpha channel. Already normalized frames are returned as is'''
+    frame = np.asarray(frame)
+    if frame.ndim == 3 and frame.shape[2] == 3 and frame.dtype == np.uint8:
+        return frame
+    return normalize_frame(frame, max_value)[:, :, :3]
+
+
+def load_image(url):
+    '''Reads an image file or URL into a uint8 RGB array, or RGBA if it has transparency (palette images are expanded on read)'''
+    # Float images, like floating point TIFF or EXR files, are read in [0, 1]
+    frame = normalize_frame(imageio.imread(url), max_value=1)
+    if frame.shape[2] == 4 and (frame[:, :, 3] == 255).all():
+        frame = frame[:, :, :3]
+    return frame
+
+
+def load_image_clip(url) -> ImageClip:
+    '''Loads an image as an ImageClip, with a mask built from its alpha channel if it has one'''
+    return ImageClip(load_image(url))
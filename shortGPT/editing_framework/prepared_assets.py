@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from moviepy.editor import VideoClip, VideoFileClip
+
+from shortGPT.editing_utils.media_probe import get_source_key
+
+PREPARED_ASSETS_DIR = '.database/prepared_assets'
+# Actions that only change the pixels of the frames, and can be baked into a prepared asset
+PIXEL_ACTIONS = {'resize', 'crop', 'green_screen'}
+
+
+def split_pixel_actions(actions: List[Dict[str, Any]]):
+    pixel_actions = [action for action in actions if action['type'] in PIXEL_ACTIONS]
+    other_actions = [action for action in actions if action['type'] not in PIXEL_ACTIONS]
+    return pixel_actions, other_actions
+
+
+def get_prepared_asset_key(url, pixel_actions: List[Dict[str, Any]]):
+    key = {'source': get_source_key(url), 'actions': pixel_actions}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def bake_video(clip: VideoFileClip, frames_path, info_path):
+    '''Writes the RGB frames and mask of clip into a (n_frames, height, width, 4) uint8 .npy memmap, and a JSON sidecar'''
+    fps = clip.fps
+    n_frames = max(int(np.ceil(clip.duration * fps - 1e-6)), 1)
+    width, height = clip.size
+    temporary_path = f"{frames_path}.tmp-{os.getpid()}.npy"
+    frames = np.lib.format.open_memmap(temporary_path, mode='w+', dtype=np.uint8, shape=(n_frames, height, width, 4))
+    for i in range(n_frames):
+        t = min(i / fps, clip.duration)
+        frames[i, :, :, :3] = clip.get_frame(t)
+        frames[i, :, :, 3] = 255 if clip.mask is None else np.round(clip.mask.get_frame(t) * 255)
+    frames.flush()
+    del frames
+    os.replace(temporary_path, frames_path)
+    # The sidecar is written last, its presence marks a complete bake
+    temporary_info_path = f"{info_path}.tmp-{os.getpid()}"
+    with open(temporary_info_path, 'w') as f:
+        json.dump({'fps': fps, 'duration': clip.duration, 'size': [width, height], 'n_frames': n_frames}, f)
+    os.replace(temporary_info_path, info_path)
+
+
+def load_prepared_video(frames_path, info_path) -> VideoClip:
+    with open(info_path) as f:
+        info = json.load(f)
+    frames = np.load(frames_path, mmap_mode='r')
+    fps = info['fps']
+    last_frame = info['n_frames'] - 1
+
+    def frame_index(t):
+        return min(max(int(t * fps + 1e-6), 0), last_frame)
+
+    clip = VideoClip(lambda t: np.asarray(frames[frame_index(t), :, :, :3]), duration=info['duration'])
+    clip.mask = VideoClip(lambda t: frames[frame_index(t), :, :, 3] / 255.0, ismask=True, duration=info['duration'])
+    clip.fps = fps
+    clip.mask.fps = fps
+    return clip
+
+
+def get_prepared_video(url, pixel_actions: List[Dict[str, Any]], prepare_function: Callable[[], VideoFileClip],
+                       prepared_assets_dir=PREPARED_ASSETS_DIR) -> VideoClip:
+    '''
+    Returns the video at url with its pixel actions (resize, crop, green screen) applied, as an RGB clip with a mask.
+    The first call bakes the clip returned by prepare_function to disk, later calls load the baked frames.
+    '''
+    key = get_prepared_asset_key(url, pixel_actions)
+    frames_path = os.path.join(prepared_assets_dir, f"{key}.npy")
+    info_path = os.path.join(prepared_assets_dir, f"{key}.json")
+    if not (os.path.isfile(info_path) and os.path.isfile(frames_path)):
+        os.makedirs(prepared_assets_dir, exist_ok=True)
+        clip = prepare_function()
+        try:
+            bake_video(clip, frames_path, info_path)
+        finally:
+            clip.close()
+    return load_prepared_video(frames_path, info_path)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Callable, Dict
+
+from shortGPT.config.hashing import hash_file
+from shortGPT.editing_utils.media_probe import get_source_key
+
+RENDER_CACHE_DIR = '.database/render_cache'
+RENDER_CACHE_MAX_SIZE = 20 * 1024 ** 3
+
+
+def get_asset_key(url):
+    '''
+    Identity of an asset url in a render key: the sha256 of a local file, whatever its path and mtime, or the stable
+    identity of a remote url, so re-resolved signed googlevideo urls give the same key
+    '''
+    if os.path.isfile(url):
+        return {'sha256': hash_file(url)}
+    return get_source_key(url)
+
+
+def normalize_schema(schema: Dict[str, Any]):
+    '''Copy of a schema whose asset urls are replaced by their get_asset_key identities'''
+    normalized_schema = dict(schema)
+    for asset_group in ('visual_assets', 'audio_assets'):
+        if asset_group not in schema:
+            continue
+        normalized_schema[asset_group] = {}
+        for name, asset in schema[asset_group].items():
+            url = asset.get('parameters', {}).get('url')
+            if isinstance(url, str):
+                asset = {**asset, 'parameters': {**asset['parameters'], 'url': get_asset_key(url)}}
+            normalized_schema[asset_group][name] = asset
+    return normalized_schema
+
+
+def get_render_key(schema: Dict[str, Any], kind='video'):
+    '''Hash of the schema, with its asset urls replaced by the identity of the files and remote sources they point to'''
+    key = {
+        'kind': kind,
+        'schema': normalize_schema(schema),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, separators=(',', ':'), default=str).encode()).hexdigest()
+
+
+def get_temporary_path(path):
+    base, ext = os.path.splitext(path)
+    return f"{base}.tmp-{os.getpid()}{ext}"
+
+
+def link_or_copy(source, destination):
+    '''Atomically places a copy of source at destination, as a hardlink when the filesystem allows it'''
+    temporary_path = get_temporary_path(destination)
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+    try:
+        os.link(source, temporary_path)
+    except OSError:
+        shutil.copyfile(source, temporary_path)
+    os.replace(temporary_path, destination)
+
+
+class RenderCache:
+    def __init__(self, cache_dir=RENDER_CACHE_DIR, max_size=RENDER_CACHE_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def get_cache_path(self, key, ext):
+        return os.path.join(self.cache_dir, key[:2], key + ext)
+
+    def serve(self, key, output_path):
+        cache_path = self.get_cache_path(key, os.path.splitext(output_path)[1])
+        if not os.path.isfile(cache_path):
+            return False
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        try:
+            os.utime(cache_path)
+            link_or_copy(cache_path, output_path)
+        except FileNotFoundError:
+            # Pruned by another worker since the check
+            return False
+        return True
+
+    def store(self, key, rendered_path):
+        cache_path = self.get_cache_path(key, os.path.splitext(rendered_path)[1])
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        link_or_copy(rendered_path, cache_path)
+        self.prune()
+
+    def render(self, schema: Dict[str, Any], output_path, render_function: Callable[[str], Any], kind='video'):
+        '''
+        Serves output_path from the cache if the same schema was already rendered from the same input files.
+        Otherwise renders it with render_function(path) to a temporary path, stores it, and moves it in place,
+        so output_path is never left half-written.
+        '''
+        key = get_render_key(schema, kind)
+        if self.serve(key, output_path):
+            return output_path
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        temporary_path = get_temporary_path(output_path)
+        try:
+            render_function(temporary_path)
+            self.store(key, temporary_path)
+            os.replace(temporary_path, output_path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        return output_path
+
+    def prune(self):
+        '''
+        Removes the least recently used renders until the cache fits in max_size.
+        Several workers can prune the same cache: files other workers are writing or have already removed are skipped.
+        '''
+        if not self.max_size or not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                # Files being placed by link_or_copy in this or another worker
+                if '.tmp-' in name:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
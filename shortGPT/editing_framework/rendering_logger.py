@@ -2,18 +2,21 @@ from proglog import ProgressBarLogger
 import time
 
 class MoviepyProgressLogger(ProgressBarLogger):
-    
+
     def __init__(self, callBackFunction = None):
         super().__init__()
         self.callBackFunction = callBackFunction
         self.start_time = time.time()
-    
+
     def bars_callback(self, bar, attr, value, old_value=None):
-        # Every time the logger progress is updated, this function is called        
-        percentage = (value / self.bars[bar]['total']) * 100
+        # Every time the logger progress is updated, this function is called
+        self.report_progress(value, self.bars[bar]['total'])
+
+    def report_progress(self, value, total):
+        percentage = (value / total) * 100
         elapsed_time = time.time() - self.start_time
         estimated_time = (elapsed_time / percentage) * (100 - percentage) if percentage != 0 else 0
-        progress_string = f'Rendering progress : {value}/{self.bars[bar]["total"]} | Time spent: {self.format_time(elapsed_time)} | Time left: {self.format_time(estimated_time)}'
+        progress_string = f'Rendering progress : {value}/{total} | Time spent: {self.format_time(elapsed_time)} | Time left: {self.format_time(estimated_time)}'
         if (self.callBackFunction):
             self.callBackFunction(progress_string)
         else:
@@ -22,3 +25,17 @@ class MoviepyProgressLogger(ProgressBarLogger):
     def format_time(self, seconds):
         minutes, seconds = divmod(seconds, 60)
         return f'{int(minutes)}m {int(seconds)}s'
+
+
+class FFmpegProgressLogger(MoviepyProgressLogger):
+    '''Reports the `-progress` output of an ffmpeg render with the same messages as the moviepy renders'''
+
+    def __init__(self, total_frames, callBackFunction = None):
+        super().__init__(callBackFunction)
+        self.total_frames = max(int(total_frames), 1)
+
+    def read_progress(self, stream):
+        for line in stream:
+            key, _, value = line.strip().partition('=')
+            if key == 'frame' and value.isdigit():
+                self.report_progress(min(int(value), self.total_frames), self.total_frames)
@@ -0,0 +1,93 @@
+import json
+from types import MappingProxyType
+from typing import Any, Dict
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def copy_template(node):
+    '''Structural copy of a parsed JSON tree: dicts and lists are copied, leaf values are shared'''
+    if isinstance(node, dict):
+        return {key: copy_template(value) for key, value in node.items()}
+    if isinstance(node, list):
+        return [copy_template(value) for value in node]
+    return node
+
+
+def check_inputs(template_name, inputs, args):
+    for required_argument in inputs:
+        if required_argument not in args:
+            raise Exception(
+                f"Error. '{required_argument}' input missing, you must include it to use this editing step")
+    unexpected_arguments = [arg_name for arg_name in args if arg_name not in inputs]
+    if unexpected_arguments:
+        raise Exception(
+            f"Error. Unexpected input(s) {unexpected_arguments} for '{template_name}', the declared inputs are {list(inputs)}")
+
+
+class StepTemplate:
+    '''
+    An editing step JSON, parsed once. Each declared input is resolved to the parameter and/or
+    the actions (by type) it fills, so instantiating a step is a copy plus a few assignments.
+    '''
+
+    def __init__(self, file_name, json_step: Dict[str, Any]):
+        self.file_name = file_name
+        (self.name, template), = json_step.items()
+        self.type = template['type']
+        self.__template = template
+        declared_inputs = template.get('inputs', {})
+        parameter_names = template.get('parameters', {})
+        actions = template.get('actions', [])
+        slots = {}
+        for input_name in declared_inputs.get('actions', []) + declared_inputs.get('parameters', []):
+            is_parameter = input_name in parameter_names
+            action_indices = tuple(i for i, action in enumerate(actions) if action['type'] == input_name)
+            if not is_parameter and not action_indices:
+                raise Exception(f"Error. Input '{input_name}' of editing step '{file_name}' does not match any of its parameters or actions")
+            slots[input_name] = (is_parameter, action_indices)
+        self.slots = MappingProxyType(slots)
+
+    def instantiate(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        check_inputs(self.file_name, self.slots, args)
+        step = copy_template(self.__template)
+        for arg_name, value in args.items():
+            is_parameter, action_indices = self.slots[arg_name]
+            if is_parameter:
+                step['parameters'][arg_name] = value
+            for i in action_indices:
+                step['actions'][i]['param'] = value
+        return step
+
+
+class FlowTemplate:
+    '''A flow JSON, parsed once, with its input paths split into keys'''
+
+    def __init__(self, file_name, json_flow: Dict[str, Any]):
+        self.file_name = file_name
+        self.__template = json_flow
+        self.slots = MappingProxyType({input_name: tuple(path.split("/"))
+                                       for input_name, path in json_flow['inputs'].items()})
+
+    def instantiate(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        check_inputs(self.file_name, self.slots, args)
+        flow = copy_template(self.__template)
+        for arg_name, path_keys in self.slots.items():
+            node = flow
+            for path_key in path_keys[:-1]:
+                node = node.setdefault(path_key, {})
+            node[path_keys[-1]] = args[arg_name]
+        return flow
+
+
+def load_templates(step_enum, steps_path, flow_enum, flows_path):
+    '''Loads every editing step and flow template into a read-only mapping keyed by enum member'''
+    templates = {}
+    for step in step_enum:
+        templates[step] = StepTemplate(step.value, load_json(steps_path / step.value))
+    for flow in flow_enum:
+        templates[flow] = FlowTemplate(flow.value, load_json(flows_path / flow.value))
+    return MappingProxyType(templates)
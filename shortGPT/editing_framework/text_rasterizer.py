@@ -0,0 +1,160 @@
+import math
+import os
+import shutil
+import subprocess
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont, features
+
+TEXT_CACHE_SIZE = 2048
+# Pillow only shapes and reorders right-to-left and complex scripts with libraqm
+RAQM_AVAILABLE = features.check('raqm')
+# Scripts whose glyphs change with their neighbours: Indic scripts through Sinhala, then Thai, Lao, Tibetan, Myanmar, Khmer
+COMPLEX_SCRIPT_RANGES = ((0x0900, 0x0DFF), (0x0E00, 0x0FFF), (0x1000, 0x109F), (0x1780, 0x17FF))
+
+
+@lru_cache(maxsize=None)
+def find_font_file(font):
+    '''Resolves an ImageMagick font name (like "Roboto-Bold") to a font file Pillow can load'''
+    if not font:
+        return None
+    if os.path.isfile(font):
+        return font
+    for candidate in (font, font + ".ttf", font + ".otf"):
+        try:
+            ImageFont.truetype(candidate, 10)
+            return candidate
+        except OSError:
+            pass
+    if shutil.which("fc-match"):
+        family, _, style = font.partition("-")
+        pattern = f"{family}:style={style}" if style else family
+        output = subprocess.run(["fc-match", "-f", "%{file}", pattern], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        if output.returncode == 0 and os.path.isfile(output.stdout.strip()):
+            return output.stdout.strip()
+    return None
+
+
+def get_text_direction(text):
+    '''Returns "rtl" for right-to-left text, "ltr" for other text that needs shaping, or None for text Pillow draws as is'''
+    needs_shaping = False
+    for char in text:
+        if unicodedata.bidirectional(char) in ('R', 'AL'):
+            return 'rtl'
+        if any(start <= ord(char) <= end for start, end in COMPLEX_SCRIPT_RANGES):
+            needs_shaping = True
+    return 'ltr' if needs_shaping else None
+
+
+def get_text_style_key(parameters: Dict[str, Any]):
+    '''Returns the hashable cache key of a text asset, or None if it cannot be rasterized with Pillow'''
+    font_file = find_font_file(parameters.get('font'))
+    if font_file is None or not parameters.get('fontsize') or parameters.get('text') is None:
+        return None
+    text = str(parameters['text'])
+    kerning = parameters.get('kerning') or 0
+    direction = get_text_direction(text)
+    # Shaped text is left to TextClip without libraqm, and with kerning, which draws characters one by one
+    if direction and (not RAQM_AVAILABLE or kerning):
+        return None
+    size = tuple(parameters['size']) if parameters.get('size') else None
+    return (text, font_file, parameters['fontsize'], parameters.get('color', 'black'),
+            parameters.get('stroke_width') or 0, parameters.get('stroke_color'), kerning,
+            parameters.get('method', 'label'), size, parameters.get('align', 'center'), direction)
+
+
+def rasterize_text_parameters(parameters: Dict[str, Any]):
+    key = get_text_style_key(parameters)
+    if key is None:
+        return None
+    return rasterize_text(*key)
+
+
+def prerender_text_assets(assets: List[Dict[str, Any]], max_workers=None):
+    '''Fills the rasterizer cache for all the text assets of a schema before compositing starts'''
+    keys = {get_text_style_key(asset['parameters']) for asset in assets if asset['type'] == 'text'}
+    keys.discard(None)
+    if not keys:
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda key: rasterize_text(*key), keys))
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def rasterize_text(text, font_file, fontsize, color, stroke_width, stroke_color, kerning, method, size, align, direction=None):
+    """
+    Renders text the way ImageMagick's label: and caption: do for moviepy's TextClip, into a read-only RGBA array.
+    Right-to-left and complex script text is given a direction, and is shaped by libraqm.
+    Cached arrays are shared between clips, they must not be modified in place.
+    """
+    font = ImageFont.truetype(font_file, int(fontsize))
+    ascent, descent = font.getmetrics()
+    line_height = ascent + descent
+    # ImageMagick centers the stroke on the glyph outline, Pillow draws it entirely outside
+    stroke = int(math.ceil(stroke_width / 2)) if stroke_color else 0
+    box_width, box_height = size if size else (None, None)
+
+    def line_width(line):
+        if not kerning:
+            return font.getlength(line, direction=direction)
+        return sum(font.getlength(char) for char in line) + kerning * max(len(line) - 1, 0)
+
+    lines = []
+    for paragraph in text.split("\n"):
+        if method == 'caption' and box_width:
+            lines += wrap_words(paragraph.split(" "), line_width, box_width - 2 * stroke)
+        else:
+            lines.append(paragraph)
+    widths = [line_width(line) for line in lines]
+
+    text_height = len(lines) * line_height + 2 * stroke
+    width = int(box_width or math.ceil(max(widths) + 2 * stroke))
+    height = int(box_height or text_height)
+    align = align.lower()
+    if 'north' in align:
+        y = stroke
+    elif 'south' in align:
+        y = height - text_height + stroke
+    else:
+        y = (height - text_height) / 2 + stroke
+
+    image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    fill = ImageColor.getrgb(color)
+    stroke_fill = ImageColor.getrgb(stroke_color) if stroke else None
+    for line, w in zip(lines, widths):
+        if 'west' in align:
+            x = stroke
+        elif 'east' in align:
+            x = width - w - stroke
+        else:
+            x = (width - w) / 2
+        if not kerning:
+            draw.text((x, y), line, font=font, fill=fill, stroke_width=stroke, stroke_fill=stroke_fill, direction=direction)
+        else:
+            for char in line:
+                draw.text((x, y), char, font=font, fill=fill, stroke_width=stroke, stroke_fill=stroke_fill)
+                x += font.getlength(char) + kerning
+        y += line_height
+
+    frame = np.array(image)
+    frame.flags.writeable = False
+    return frame
+
+
+def wrap_words(words, line_width, max_width):
+    lines = []
+    current = ""
+    for word in words:
+        candidate = f"{current} {word}" if current else word
+        if current and line_width(candidate) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    lines.append(current)
+    return lines
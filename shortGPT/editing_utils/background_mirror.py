@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import random
+import threading
+
+import ffmpeg
+
+from shortGPT.editing_utils.handle_videos import SHORT_VIDEO_FILTER
+from shortGPT.editing_utils.media_probe import get_source_key, probe_keyframe_times
+
+BACKGROUND_MIRROR_DIR = '.database/background_mirror'
+PROXY_FPS = 30
+# Seconds between the keyframes of a proxy, which is the granularity of the clips cut from it
+PROXY_KEYFRAME_INTERVAL = 1
+# Random background clips are only taken between 15% and 85% of a video, so only this part is mirrored
+MIRRORED_RANGE = (0.15, 0.85)
+
+_locks_lock = threading.Lock()
+_mirror_locks = {}
+
+
+def get_mirror_key(source):
+    return hashlib.sha256(json.dumps(get_source_key(source), sort_keys=True).encode()).hexdigest()
+
+
+def get_mirror_lock(key):
+    '''Lock held by the thread building a mirror, so the other jobs of the process wait for it rather than transcode it again'''
+    with _locks_lock:
+        return _mirror_locks.setdefault(key, threading.Lock())
+
+
+def get_temporary_path(path, suffix=".tmp"):
+    '''Temporary path to write a file to before renaming it, unique to the writing process and thread'''
+    return f"{path}.{os.getpid()}.{threading.get_ident()}{suffix}"
+
+
+def transcode_proxy(video_url, start_time, duration, output_file):
+    '''Transcodes a part of a video to the short geometry, without audio, with a keyframe every PROXY_KEYFRAME_INTERVAL seconds'''
+    gop_size = PROXY_FPS * PROXY_KEYFRAME_INTERVAL
+    (
+        ffmpeg
+        .input(video_url, ss=start_time, t=duration)
+        .output(output_file, vf=f"{SHORT_VIDEO_FILTER},fps={PROXY_FPS}", vcodec="libx264", preset="veryfast", crf=20,
+                g=gop_size, keyint_min=gop_size, sc_threshold=0, an=None, movflags="+faststart", format="mp4")
+        .overwrite_output()
+        .run(quiet=True)
+    )
+
+
+def get_background_mirror(source, resolve_source, mirror_dir=BACKGROUND_MIRROR_DIR):
+    '''
+    Returns the mirror of a background video: the path of its local proxy, the proxy duration and its keyframe times.
+    source identifies the video (a YouTube url or a local path). On the first call, resolve_source() returns the
+    url to download from and the duration of the video, and the mirrored range is transcoded once.
+    '''
+    key = get_mirror_key(source)
+    proxy_path = os.path.join(mirror_dir, f"{key}.mp4")
+    index_path = os.path.join(mirror_dir, f"{key}.json")
+    with get_mirror_lock(key):
+        if os.path.isfile(index_path) and os.path.isfile(proxy_path):
+            with open(index_path, 'r') as f:
+                return json.load(f)
+
+        video_url, video_duration = resolve_source()
+        if not video_duration:
+            raise Exception("Could not get video duration")
+        if not video_duration*0.7 > 120:
+            raise Exception("Video too short")
+        start_time = video_duration * MIRRORED_RANGE[0]
+        duration = video_duration * (MIRRORED_RANGE[1] - MIRRORED_RANGE[0])
+        os.makedirs(mirror_dir, exist_ok=True)
+        # Other processes can build the same mirror, each writes its own temporary files
+        temporary_path = get_temporary_path(proxy_path, ".tmp.mp4")
+        try:
+            transcode_proxy(video_url, start_time, duration, temporary_path)
+            keyframes = probe_keyframe_times(temporary_path)
+            if not keyframes:
+                raise Exception(f"The mirror of {source} has no keyframes")
+            os.replace(temporary_path, proxy_path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        mirror = {'path': proxy_path, 'duration': duration, 'keyframes': keyframes, 'source_start_time': start_time}
+        # The index is written last, its presence marks a complete mirror
+        temporary_index_path = get_temporary_path(index_path)
+        with open(temporary_index_path, 'w') as f:
+            json.dump(mirror, f)
+        os.replace(temporary_index_path, index_path)
+        return mirror
+
+
+def extract_random_clip_from_mirror(mirror, clip_duration, output_file):
+    '''Cuts a clip starting at a random keyframe of a background mirror, by stream copy'''
+    start_times = [t for t in mirror['keyframes'] if t + clip_duration <= mirror['duration']]
+    if not start_times:
+        raise Exception("Video too short")
+    (
+        ffmpeg
+        .input(mirror['path'], ss=random.choice(start_times))
+        .output(output_file, t=clip_duration, c="copy", avoid_negative_ts="make_zero")
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    if not os.path.exists(output_file):
+        raise Exception("Random clip failed to be written")
+    return output_file
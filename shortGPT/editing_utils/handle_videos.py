@@ -1,40 +1,26 @@
 import ffmpeg
 import os
 import random
-import yt_dlp
-import subprocess
-import json
 
-def getYoutubeVideoLink(url):
+from shortGPT.editing_utils.media_probe import get_media_info
+from shortGPT.editing_utils.youtube_resolver import YOUTUBE_RESOLVER
+
+# Center crop to 9:16 and scale to the 1080x1920 short geometry
+SHORT_VIDEO_FILTER = "crop=trunc(ih*9/32)*2:ih,scale=1080:1920,setsar=1"
+
+def get_youtube_video_format(url):
     if 'shorts' in url:
-        ydl_opts = {
-            "quiet": True,
-            "no_warnings": True,
-            "no_color": True,
-            "no_call_home": True,
-            "no_check_certificate": True,
-            "format": "bestvideo[height<=1920]"
-        }
-    else:
-        ydl_opts = {
-        "quiet": True,
-        "no_warnings": True,
-        "no_color": True,
-        "no_call_home": True,
-        "no_check_certificate": True,
-        "format": "bestvideo[height<=1080]"
-        }
+        return "bestvideo[height<=1920]"
+    return "bestvideo[height<=1080]"
+
+def getYoutubeVideoLink(url):
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            dictMeta = ydl.extract_info(
-                url,
-                download=False)
-            return dictMeta['url'], dictMeta['duration']
+        return YOUTUBE_RESOLVER.resolve(url, get_youtube_video_format(url))
     except Exception as e:
         print("Failed getting video link from the following video/url", e.args[0])
     return None, None
 
-def extract_random_clip_from_video(video_url, video_duration, clip_duration , output_file):
+def extract_random_clip_from_video(video_url, video_duration, clip_duration , output_file, vf=None):
     print(video_url, video_duration, clip_duration , output_file)
     """Extracts a clip from a video using a signed URL.
     Args:
@@ -43,6 +29,7 @@ def extract_random_clip_from_video(video_url, video_duration, clip_duration , ou
         start_time (int): The start time of the clip in seconds.
         clip_duration (int): The duration of the clip in seconds.
         output_file (str): The output file path for the extracted clip.
+        vf (str): Optional ffmpeg video filter applied while the clip is encoded, like SHORT_VIDEO_FILTER.
     """
     if not video_duration:
         raise Exception("Could not get video duration")
@@ -50,10 +37,13 @@ def extract_random_clip_from_video(video_url, video_duration, clip_duration , ou
         raise Exception("Video too short")
     start_time = video_duration*0.15 + random.random()* (0.7*video_duration-clip_duration)
     
+    output_args = {'codec': "libx264", 'preset': "ultrafast"}
+    if vf:
+        output_args['vf'] = vf
     (
         ffmpeg
         .input(video_url, ss=start_time, t=clip_duration)
-        .output(output_file, codec="libx264", preset="ultrafast")
+        .output(output_file, **output_args)
         .run()
     )
     if not os.path.exists(output_file):
@@ -62,27 +52,8 @@ def extract_random_clip_from_video(video_url, video_duration, clip_duration , ou
 
 
 def get_aspect_ratio(video_file):
-    cmd = 'ffprobe -i "{}" -v quiet -print_format json -show_format -show_streams'.format(video_file)
-#     jsonstr = subprocess.getoutput(cmd)
-    jsonstr = subprocess.check_output(cmd, shell=True, encoding='utf-8')
-    r = json.loads(jsonstr)
-    # look for "codec_type": "video". take the 1st one if there are mulitple
-    video_stream_info = [x for x in r['streams'] if x['codec_type']=='video'][0]
-    if 'display_aspect_ratio' in video_stream_info and video_stream_info['display_aspect_ratio']!="0:1":
-        a,b = video_stream_info['display_aspect_ratio'].split(':')
-        dar = int(a)/int(b)
-    else:
-        # some video do not have the info of 'display_aspect_ratio'
-        w,h = video_stream_info['width'], video_stream_info['height']
-        dar = int(w)/int(h)
-        ## not sure if we should use this
-        #cw,ch = video_stream_info['coded_width'], video_stream_info['coded_height']
-        #sar = int(cw)/int(ch)
-    if 'sample_aspect_ratio' in video_stream_info and video_stream_info['sample_aspect_ratio']!="0:1":
-        # some video do not have the info of 'sample_aspect_ratio'
-        a,b = video_stream_info['sample_aspect_ratio'].split(':')
-        sar = int(a)/int(b)
-    else:
-        sar = dar
-    par = dar/sar
-    return dar
\ No newline at end of file
+    video_info = get_media_info(video_file)
+    if not video_info.get('video_codec'):
+        raise Exception(f"The file {video_file} has no video stream")
+    # some video do not have the info of 'display_aspect_ratio'
+    return video_info['display_aspect_ratio'] or video_info['width'] / video_info['height']
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import re
+import struct
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from statistics import median
+from urllib.parse import parse_qs, urlparse
+
+PROBE_CACHE_DIR = '.database/probe_cache'
+# Seconds of video scanned for keyframes, and of audio measured for the loudness
+KEYFRAME_WINDOW = 60
+LOUDNESS_WINDOW = 60
+WAV_FORMATS = {1: 'pcm', 3: 'pcm_float', 6: 'pcm_alaw', 7: 'pcm_mulaw', 0xFFFE: 'pcm'}
+
+_probe_cache = {}
+
+
+def run_ffprobe(args):
+    cmd = ["ffprobe", "-v", "quiet", "-print_format", "json", *args]
+    output = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if output.returncode != 0:
+        raise Exception(f"Error executing command using ffprobe. {output.stderr.strip()}")
+    return json.loads(output.stdout)
+
+
+def parse_rate(rate):
+    '''Parses an ffprobe rate like "30000/1001", returns None if it is unknown'''
+    try:
+        numerator, _, denominator = rate.partition('/')
+        value = float(numerator) / float(denominator or 1)
+        return value if value > 0 else None
+    except (AttributeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def get_source_key(url):
+    '''Stable identity of a media source. Signed googlevideo urls change on every resolve, their id and itag do not'''
+    parsed_url = urlparse(url)
+    if parsed_url.netloc.endswith('googlevideo.com'):
+        query = parse_qs(parsed_url.query)
+        return {'id': query.get('id'), 'itag': query.get('itag')}
+    if os.path.isfile(url):
+        stat = os.stat(url)
+        return {'path': os.path.abspath(url), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    return {'url': url}
+
+
+def parse_ratio(ratio):
+    '''Parses an ffprobe aspect ratio like "16:9", returns None if it is unknown'''
+    try:
+        width, _, height = ratio.partition(':')
+        value = int(width) / int(height)
+        return value if value > 0 else None
+    except (AttributeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def read_wav_header(path):
+    '''Duration and codec of a RIFF WAVE file read from its header, or None if it is not one'''
+    with open(path, 'rb') as f:
+        riff_header = f.read(12)
+        if len(riff_header) < 12 or riff_header[:4] != b'RIFF' or riff_header[8:12] != b'WAVE':
+            return None
+        audio_format = byte_rate = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                return None
+            chunk_id, chunk_size = chunk_header[:4], struct.unpack('<I', chunk_header[4:])[0]
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                if len(fmt) < 16:
+                    return None
+                audio_format, _, _, byte_rate = struct.unpack('<HHII', fmt[:12])
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if audio_format not in WAV_FORMATS or not byte_rate:
+                    return None
+                data_start = f.tell()
+                file_size = os.fstat(f.fileno()).st_size
+                # Streamed writers leave the size unset, the data then runs to the end of the file
+                data_size = min(chunk_size, file_size - data_start)
+                return {'duration': data_size / byte_rate, 'audio_codec': WAV_FORMATS[audio_format]}
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def write_probe_cache(cache_path, info):
+    '''Writes a probe result through a temporary file unique to the writer. A failed write only skips the cache'''
+    temporary_path = None
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(cache_path), suffix=".tmp", delete=False) as f:
+            temporary_path = f.name
+            json.dump(info, f)
+        os.replace(temporary_path, cache_path)
+    except OSError as e:
+        print(f"Failed caching the probe results in {cache_path}. {e}")
+        if temporary_path and os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def get_media_info(url, probe_cache_dir=PROBE_CACHE_DIR):
+    '''
+    Returns the probe_streams results of a local file or url. Local WAV files are read from their header.
+    Other results are cached on disk, keyed by the path, size and modification time of local files,
+    or by the id and itag of googlevideo urls and by the url itself otherwise.
+    '''
+    if url.lower().endswith('.wav') and os.path.isfile(url):
+        info = read_wav_header(url)
+        if info:
+            return info
+    key = hashlib.sha256(json.dumps(get_source_key(url), sort_keys=True).encode()).hexdigest()
+    if key not in _probe_cache:
+        cache_path = os.path.join(probe_cache_dir, f"{key}.json")
+        try:
+            with open(cache_path, 'r') as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            info = probe_streams(url)
+            write_probe_cache(cache_path, info)
+        _probe_cache[key] = info
+    return dict(_probe_cache[key])
+
+
+def probe_streams(path):
+    '''Duration, resolution, fps, aspect ratio and codecs of a media file, from its container and first video and audio streams'''
+    metadata = run_ffprobe(["-show_format", "-show_streams", "-i", path])
+    streams = metadata.get('streams', [])
+    video_stream = next((s for s in streams if s.get('codec_type') == 'video' and not s.get('disposition', {}).get('attached_pic')), None)
+    audio_stream = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    duration = metadata.get('format', {}).get('duration')
+    info = {'duration': float(duration) if duration else None}
+    if video_stream:
+        info.update({
+            'width': video_stream.get('width'),
+            'height': video_stream.get('height'),
+            'fps': parse_rate(video_stream.get('avg_frame_rate')) or parse_rate(video_stream.get('r_frame_rate')),
+            'display_aspect_ratio': parse_ratio(video_stream.get('display_aspect_ratio')),
+            'video_codec': video_stream.get('codec_name'),
+        })
+    if audio_stream:
+        info['audio_codec'] = audio_stream.get('codec_name')
+    return info
+
+
+def probe_keyframe_times(path, window=None):
+    '''Sorted times in seconds of the keyframes of the video, of its first window seconds if window is set'''
+    read_intervals = ["-read_intervals", f"%+{window}"] if window else []
+    metadata = run_ffprobe(["-select_streams", "v:0", "-skip_frame", "nokey", *read_intervals,
+                            "-show_entries", "frame=best_effort_timestamp_time", "-i", path])
+    return sorted(float(frame['best_effort_timestamp_time']) for frame in metadata.get('frames', [])
+                  if frame.get('best_effort_timestamp_time') not in (None, 'N/A'))
+
+
+def probe_keyframe_interval(path, window=KEYFRAME_WINDOW):
+    '''Median seconds between the keyframes of the first window seconds of the video, or None if there are less than two'''
+    times = probe_keyframe_times(path, window)
+    intervals = [b - a for a, b in zip(times, times[1:]) if b > a]
+    return median(intervals) if intervals else None
+
+
+def probe_loudness(path, start=0, window=LOUDNESS_WINDOW):
+    '''Integrated loudness in LUFS of window seconds of audio from start, measured by ffmpeg's loudnorm filter'''
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-ss", str(start), "-t", str(window), "-i", path,
+           "-vn", "-af", "loudnorm=print_format=json", "-f", "null", "-"]
+    output = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if output.returncode != 0:
+        raise Exception(f"Error measuring loudness using ffmpeg. {output.stderr.strip()[-500:]}")
+    match = re.search(r"\{[^{}]*\"input_i\"[^{}]*\}", output.stderr)
+    if not match:
+        return None
+    loudness = json.loads(match.group(0))['input_i']
+    try:
+        loudness = float(loudness)
+    except ValueError:
+        return None
+    # Silence is reported as -inf
+    return loudness if loudness > -70 else None
+
+
+def probe_media(path):
+    '''
+    Duration, resolution, fps, codecs, keyframe interval and loudness of a local media file.
+    The loudness is measured on the window that background clips are extracted from, after the first 15%.
+    '''
+    info = get_media_info(path)
+    if info.get('video_codec'):
+        info['keyframe_interval'] = probe_keyframe_interval(path)
+    if info.get('audio_codec'):
+        duration = info.get('duration') or 0
+        start = duration * 0.15 if duration * 0.85 > LOUDNESS_WINDOW else 0
+        info['loudness'] = probe_loudness(path, start)
+    return info
+
+
+def _probe_media_or_error(path):
+    try:
+        return path, probe_media(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def probe_media_files(paths, max_workers=None):
+    '''
+    Probes many media files at once in a process pool.
+    Returns a dictionary of path to probe_media results, files that could not be probed map to None.
+    '''
+    paths = list(paths)
+    results = {}
+    if not paths:
+        return results
+    max_workers = min(max_workers or os.cpu_count() or 1, len(paths))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for path, info, error in executor.map(_probe_media_or_error, paths):
+            if error:
+                print(f"Failed probing the media file {path}. {error}")
+            results[path] = info
+    return results
@@ -0,0 +1,151 @@
+import hashlib
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import yt_dlp
+
+# A resolved url is only returned if it stays valid for at least this many seconds, enough to render with it
+MIN_VALIDITY = 1800
+# Seconds before expiry at which a url that was used since its last resolve is resolved again in the background
+REFRESH_MARGIN = 3600
+# Lifetime assumed for resolved urls without an expire= parameter
+DEFAULT_LIFETIME = 6 * 3600
+
+
+def get_url_expiry(signed_url, default_lifetime=DEFAULT_LIFETIME):
+    '''Unix time at which a signed googlevideo url expires, read from its expire= parameter'''
+    expire = parse_qs(urlparse(signed_url or "").query).get('expire')
+    if expire and expire[0].isdigit():
+        return int(expire[0])
+    return time.time() + default_lifetime
+
+
+class YoutubeDLExtractor:
+    '''Extracts the signed url and duration of a video with yt_dlp'''
+
+    def extract_info(self, url, format=None):
+        ydl_opts = {
+            "quiet": True,
+            "no_warnings": True,
+            "no_color": True,
+            "no_call_home": True,
+            "no_check_certificate": True
+        }
+        if format:
+            ydl_opts["format"] = format
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            return ydl.extract_info(url, download=False)
+
+
+class FakeYoutubeExtractor:
+    '''
+    Extractor for tests, which returns googlevideo-like signed urls without network access.
+    The calls are recorded in calls, and durations gives the duration of each url (600 seconds by default).
+    '''
+
+    def __init__(self, durations=None, lifetime=DEFAULT_LIFETIME):
+        self.durations = durations or {}
+        self.lifetime = lifetime
+        self.calls = []
+
+    def extract_info(self, url, format=None):
+        self.calls.append((url, format))
+        video_id = hashlib.sha1(url.encode()).hexdigest()[:16]
+        expire = int(time.time() + self.lifetime)
+        return {
+            'url': f"https://fake.googlevideo.com/videoplayback?id={video_id}&itag=137&expire={expire}&n={len(self.calls)}",
+            'duration': self.durations.get(url, 600),
+            'format_id': format or 'best',
+        }
+
+
+class YoutubeResolver:
+    '''
+    Shared cache of resolved YouTube urls. Each (url, format) entry holds the signed url, the duration and
+    the expiry of the signed url. Entries are resolved again when they have less than MIN_VALIDITY seconds
+    left, and entries that were used since they were resolved are refreshed in the background
+    REFRESH_MARGIN seconds before they expire, so callers rarely wait for yt_dlp.
+    '''
+
+    def __init__(self, extractor=None, min_validity=MIN_VALIDITY, refresh_margin=REFRESH_MARGIN):
+        self.extractor = extractor or YoutubeDLExtractor()
+        self.min_validity = min_validity
+        self.refresh_margin = refresh_margin
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def __get_key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def __is_valid(self, entry):
+        return entry is not None and entry['expire'] - time.time() > self.min_validity
+
+    def resolve(self, url, format=None):
+        '''Returns the signed url and duration of url, resolved with format'''
+        key = (url, format)
+        entry = self.entries.get(key)
+        if not self.__is_valid(entry):
+            # Concurrent callers of the same url wait for a single extraction
+            with self.__get_key_lock(key):
+                entry = self.entries.get(key)
+                if not self.__is_valid(entry):
+                    entry = self.__extract(key)
+        entry['used'] = True
+        return entry['url'], entry['duration']
+
+    def get_duration(self, url):
+        '''Returns the duration of url, from any of its entries if it was already resolved'''
+        for (entry_url, _), entry in list(self.entries.items()):
+            if entry_url == url and entry['duration'] is not None:
+                return entry['duration']
+        return self.resolve(url)[1]
+
+    def seed(self, url, format, signed_url, duration):
+        '''Adds a url resolved earlier, like one stored in the asset database, unless a fresher one is cached'''
+        key = (url, format)
+        expire = get_url_expiry(signed_url)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry['expire'] < expire:
+                self.entries[key] = {'url': signed_url, 'duration': duration, 'expire': expire, 'used': False}
+
+    def invalidate(self, url, format=None):
+        with self._lock:
+            self.entries.pop((url, format), None)
+
+    def __extract(self, key):
+        url, format = key
+        info = self.extractor.extract_info(url, format)
+        entry = {
+            'url': info.get('url'),
+            'duration': info.get('duration'),
+            'expire': get_url_expiry(info.get('url')),
+            'used': False,
+        }
+        with self._lock:
+            self.entries[key] = entry
+        self.__schedule_refresh(key, entry)
+        return entry
+
+    def __schedule_refresh(self, key, entry):
+        delay = entry['expire'] - self.refresh_margin - time.time()
+        if delay <= 0:
+            return
+        timer = threading.Timer(delay, self.__refresh, args=(key, entry))
+        timer.daemon = True
+        timer.start()
+
+    def __refresh(self, key, entry):
+        if self.entries.get(key) is not entry or not entry['used']:
+            return
+        try:
+            with self.__get_key_lock(key):
+                self.__extract(key)
+        except Exception as e:
+            print(f"Failed refreshing the resolved url of {key[0]}", e.args[0] if e.args else e)
+
+
+YOUTUBE_RESOLVER = YoutubeResolver()
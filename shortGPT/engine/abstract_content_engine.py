@@ -1,6 +1,7 @@
 import os
 from abc import ABC
 
+from shortGPT.audio.transcribers import TranscriberBackend
 from shortGPT.audio.voice_module import VoiceModule
 from shortGPT.config.languages import Language
 from shortGPT.config.path_utils import get_program_path
@@ -22,6 +23,7 @@ class AbstractContentEngine(ABC):
         self.prepareEditingPaths()
         self._db_language = language.value
         self.voiceModule = voiceModule
+        self.transcriberBackend = TranscriberBackend.WHISPER_TIMESTAMPED
         self.stepDict = {}
         self.default_logger = lambda _: None
         self.logger = self.default_logger
@@ -71,8 +73,14 @@ class AbstractContentEngine(ABC):
                 yield currentStep, f'Current step ({currentStep} / {self.get_total_steps()}) : ' + self.stepDict[currentStep].__name__
             if self.logger is not self.default_logger:
                 print(f'Step {currentStep} {self.stepDict[currentStep].__name__}')
-            self.stepDict[currentStep]()
-            self._db_last_completed_step = currentStep
+            # The step's _db_ writes are committed together with the step completion.
+            # If the step fails, what it saved is still written, and the step is run again on resume
+            self.dataManager.begin_batch()
+            try:
+                self.stepDict[currentStep]()
+                self._db_last_completed_step = currentStep
+            finally:
+                self.dataManager.commit_batch()
 
     def get_video_output_path(self):
         return self._db_video_path
@@ -83,6 +91,9 @@ class AbstractContentEngine(ABC):
     def set_logger(self, logger):
         self.logger = logger
 
+    def set_transcriber_backend(self, backend: TranscriberBackend):
+        self.transcriberBackend = backend
+
     def initializeMagickAndFFMPEG(self):
         ffmpeg_path = get_program_path("ffmpeg")
         if not ffmpeg_path:
@@ -4,7 +4,7 @@ import re
 import shutil
 from abc import abstractmethod
 
-from shortGPT.audio import audio_utils
+from shortGPT.audio import audio_utils, forced_aligner, word_alignment
 from shortGPT.audio.audio_duration import get_asset_duration
 from shortGPT.audio.voice_module import VoiceModule
 from shortGPT.config.asset_db import AssetDatabase
@@ -12,7 +12,10 @@ from shortGPT.config.languages import Language
 from shortGPT.editing_framework.editing_engine import (EditingEngine,
                                                        EditingStep)
 from shortGPT.editing_utils import captions, editing_images
-from shortGPT.editing_utils.handle_videos import extract_random_clip_from_video
+from shortGPT.editing_utils.background_mirror import extract_random_clip_from_mirror
+from shortGPT.editing_utils.handle_videos import (SHORT_VIDEO_FILTER,
+                                                 extract_random_clip_from_video,
+                                                 get_aspect_ratio)
 from shortGPT.engine.abstract_content_engine import AbstractContentEngine
 from shortGPT.gpt import gpt_editing, gpt_translate, gpt_yt
 
@@ -59,7 +62,7 @@ class ContentShortEngine(AbstractContentEngine):
         if (self._db_language != Language.ENGLISH.value):
             self._db_translated_script = gpt_translate.translateContent(script, self._db_language)
             script = self._db_translated_script
-        self._db_temp_audio_path = self.voiceModule.generate_voice(
+        self._db_temp_audio_path, self._db_voice_alignment = self.voiceModule.generate_voice_with_alignment(
             script, self.dynamicAssetDir + "temp_audio_path.wav")
 
     def _speedUpAudio(self):
@@ -71,7 +74,14 @@ class ContentShortEngine(AbstractContentEngine):
 
     def _timeCaptions(self):
         self.verifyParameters(audioPath=self._db_audio_path)
-        whisper_analysis = audio_utils.audioToText(self._db_audio_path)
+        if self._db_voice_alignment:
+            whisper_analysis = word_alignment.alignment_to_whisper_analysis(
+                self._db_voice_alignment, word_alignment.get_time_scale(self._db_temp_audio_path, self._db_audio_path))
+        else:
+            script = self._db_translated_script if self._db_language != Language.ENGLISH.value else self._db_script
+            whisper_analysis = forced_aligner.align_script(self._db_audio_path, script) if script else None
+        if not whisper_analysis:
+            whisper_analysis = audio_utils.audioToText(self._db_audio_path, backend=self.transcriberBackend)
         self._db_timed_captions = captions.getCaptionsWithTime(
             whisper_analysis)
 
@@ -106,13 +116,29 @@ class ContentShortEngine(AbstractContentEngine):
                 self._db_audio_path, isVideo=False)
         if not self._db_background_trimmed:
             self.logger("Rendering short: (2/4) preparing background video asset...")
-            self._db_background_trimmed = extract_random_clip_from_video(
-                self._db_background_video_url, self._db_background_video_duration, self._db_voiceover_duration, self.dynamicAssetDir + "clipped_background.mp4")
+            background_mirror = AssetDatabase.get_background_mirror(self._db_background_video_name)
+            if background_mirror:
+                self._db_background_trimmed = extract_random_clip_from_mirror(
+                    background_mirror, self._db_voiceover_duration, self.dynamicAssetDir + "clipped_background.mp4")
+            else:
+                self._db_background_trimmed = extract_random_clip_from_video(
+                    self._db_background_video_url, self._db_background_video_duration, self._db_voiceover_duration, self.dynamicAssetDir + "clipped_background.mp4",
+                    vf=SHORT_VIDEO_FILTER)
 
     def _prepareCustomAssets(self):
         self.logger("Rendering short: (3/4) preparing custom assets...")
         pass
 
+    def _addBackgroundVideo(self, videoEditor: EditingEngine):
+        if get_aspect_ratio(self._db_background_trimmed) > 1:
+            # Background clips extracted before they were cropped by ffmpeg are still landscape
+            videoEditor.addEditingStep(EditingStep.CROP_1920x1080, {
+                                       'url': self._db_background_trimmed})
+        else:
+            videoEditor.addEditingStep(EditingStep.ADD_BACKGROUND_VIDEO, {'url': self._db_background_trimmed,
+                                                                          'set_time_start': 0,
+                                                                          'set_time_end': self._db_voiceover_duration})
+
     def _editAndRenderShort(self):
         self.verifyParameters(
             voiceover_audio_url=self._db_audio_path,
@@ -120,34 +146,32 @@ class ContentShortEngine(AbstractContentEngine):
             music_url=self._db_background_music_url)
 
         outputPath = self.dynamicAssetDir+"rendered_video.mp4"
-        if not (os.path.exists(outputPath)):
-            self.logger("Rendering short: Starting automated editing...")
-            videoEditor = EditingEngine()
-            videoEditor.addEditingStep(EditingStep.ADD_VOICEOVER_AUDIO, {
-                                       'url': self._db_audio_path})
-            videoEditor.addEditingStep(EditingStep.ADD_BACKGROUND_MUSIC, {'url': self._db_background_music_url,
-                                                                          'loop_background_music': self._db_voiceover_duration,
-                                                                          "volume_percentage": 0.11})
-            videoEditor.addEditingStep(EditingStep.CROP_1920x1080, {
-                                       'url': self._db_background_trimmed})
-            videoEditor.addEditingStep(EditingStep.ADD_SUBSCRIBE_ANIMATION, {'url': AssetDatabase.get_asset_link('subscribe animation')})
-
-            if self._db_watermark:
-                videoEditor.addEditingStep(EditingStep.ADD_WATERMARK, {
-                                           'text': self._db_watermark})
-
-            caption_type = EditingStep.ADD_CAPTION_SHORT_ARABIC if self._db_language == Language.ARABIC.value else EditingStep.ADD_CAPTION_SHORT
-            for timing, text in self._db_timed_captions:
-                videoEditor.addEditingStep(caption_type, {'text': text.upper(),
-                                                          'set_time_start': timing[0],
-                                                          'set_time_end': timing[1]})
-            if self._db_num_images:
-                for timing, image_url in self._db_timed_image_urls:
-                    videoEditor.addEditingStep(EditingStep.SHOW_IMAGE, {'url': image_url,
-                                                                        'set_time_start': timing[0],
-                                                                        'set_time_end': timing[1]})
-
-            videoEditor.renderVideo(outputPath, logger= self.logger if self.logger is not self.default_logger else None)
+        self.logger("Rendering short: Starting automated editing...")
+        videoEditor = EditingEngine()
+        videoEditor.addEditingStep(EditingStep.ADD_VOICEOVER_AUDIO, {
+                                   'url': self._db_audio_path})
+        videoEditor.addEditingStep(EditingStep.ADD_BACKGROUND_MUSIC, {'url': self._db_background_music_url,
+                                                                      'loop_background_music': self._db_voiceover_duration,
+                                                                      "volume_percentage": 0.11})
+        self._addBackgroundVideo(videoEditor)
+        videoEditor.addEditingStep(EditingStep.ADD_SUBSCRIBE_ANIMATION, {'url': AssetDatabase.get_asset_link('subscribe animation')})
+
+        if self._db_watermark:
+            videoEditor.addEditingStep(EditingStep.ADD_WATERMARK, {
+                                       'text': self._db_watermark})
+
+        caption_type = EditingStep.ADD_CAPTION_SHORT_ARABIC if self._db_language == Language.ARABIC.value else EditingStep.ADD_CAPTION_SHORT
+        for timing, text in self._db_timed_captions:
+            videoEditor.addEditingStep(caption_type, {'text': text.upper(),
+                                                      'set_time_start': timing[0],
+                                                      'set_time_end': timing[1]})
+        if self._db_num_images:
+            for timing, image_url in self._db_timed_image_urls:
+                videoEditor.addEditingStep(EditingStep.SHOW_IMAGE, {'url': image_url,
+                                                                    'set_time_start': timing[0],
+                                                                    'set_time_end': timing[1]})
+
+        videoEditor.renderVideo(outputPath, logger= self.logger if self.logger is not self.default_logger else None)
 
         self._db_video_path = outputPath
 
@@ -43,7 +43,7 @@ class ContentTranslationEngine(AbstractContentEngine):
         video_audio, _ = get_asset_duration(self._db_src_url, isVideo=False)
         self.verifyParameters(content_path=video_audio)
         self.logger(f"1/5 - Transcribing original audio to text...")
-        whispered = audioToText(video_audio, model_size='base')
+        whispered = audioToText(video_audio, model_size='base', backend=self.transcriberBackend)
         self._db_speech_blocks = getSpeechBlocks(whispered, silence_time=0.8)
         if (ACRONYM_LANGUAGE_MAPPING.get(whispered['language']) == Language(self._db_target_language)):
             self._db_translated_timed_sentences = self._db_speech_blocks
@@ -106,7 +106,7 @@ class ContentTranslationEngine(AbstractContentEngine):
                     self.logger(f"4.5 / 5 - Generating captions in {target_language.value}")
                     editing_engine.generateAudio(self.dynamicAssetDir+"translated_voiceover.wav")
                     self._db_translated_voiceover_path = self.dynamicAssetDir+"translated_voiceover.wav"
-                whispered_translated = audioToText(self._db_translated_voiceover_path, model_size='base')
+                whispered_translated = audioToText(self._db_translated_voiceover_path, model_size='base', backend=self.transcriberBackend)
                 timed_translated_captions = getCaptionsWithTime(whispered_translated, maxCaptionSize=50 if is_landscape else 15, considerPunctuation=True)
                 self._db_timed_translated_captions = [[[t1,t2], text] for (t1, t2), text in timed_translated_captions if t2 - t1 <= 4]
             for (t1, t2), text in self._db_timed_translated_captions:
@@ -6,7 +6,7 @@ import cv2
 import logging
 
 from shortGPT.api_utils.pexels_api import getBestVideo
-from shortGPT.audio import audio_utils
+from shortGPT.audio import audio_utils, forced_aligner, word_alignment
 from shortGPT.audio.audio_duration import get_asset_duration
 from shortGPT.audio.voice_module import VoiceModule
 from shortGPT.config.asset_db import AssetDatabase
@@ -54,7 +54,7 @@ class ContentVideoEngine(AbstractContentEngine):
         if self._db_language != Language.ENGLISH.value:
             self._db_translated_script = gpt_translate.translateContent(script, self._db_language)
             script = self._db_translated_script
-        self._db_temp_audio_path = self.voiceModule.generate_voice(
+        self._db_temp_audio_path, self._db_voice_alignment = self.voiceModule.generate_voice_with_alignment(
             script, self.dynamicAssetDir + "temp_audio_path.wav")
 
     def _speedUpAudio(self):
@@ -67,7 +67,14 @@ class ContentVideoEngine(AbstractContentEngine):
     def _timeCaptions(self):
         logging.info("Step 3 _timeCaptions")
         self.verifyParameters(audioPath=self._db_audio_path)
-        whisper_analysis = audio_utils.audioToText(self._db_audio_path)
+        if self._db_voice_alignment:
+            whisper_analysis = word_alignment.alignment_to_whisper_analysis(
+                self._db_voice_alignment, word_alignment.get_time_scale(self._db_temp_audio_path, self._db_audio_path))
+        else:
+            script = self._db_translated_script if self._db_language != Language.ENGLISH.value else self._db_script
+            whisper_analysis = forced_aligner.align_script(self._db_audio_path, script) if script else None
+        if not whisper_analysis:
+            whisper_analysis = audio_utils.audioToText(self._db_audio_path, backend=self.transcriberBackend)
         max_len = 15
         if not self._db_format_vertical:
             max_len = 30
@@ -165,33 +172,32 @@ class ContentVideoEngine(AbstractContentEngine):
             voiceover_audio_url=self._db_audio_path)
 
         outputPath = self.dynamicAssetDir+"rendered_video.mp4"
-        if not (os.path.exists(outputPath)):
-            logging.info("Rendering short: Starting automated editing...")
-            videoEditor = EditingEngine()
-            videoEditor.addEditingStep(EditingStep.ADD_VOICEOVER_AUDIO, {
-                                       'url': self._db_audio_path})
-            if (self._db_background_music_url):
-                videoEditor.addEditingStep(EditingStep.ADD_BACKGROUND_MUSIC, {'url': self._db_background_music_url,
-                                                                              'loop_background_music': self._db_voiceover_duration,
-                                                                              "volume_percentage": 0.08})
-            for (t1, t2), video_url in self._db_timed_video_urls:
-                videoEditor.addEditingStep(EditingStep.ADD_BACKGROUND_VIDEO, {'url': video_url,
-                                                                              'set_time_start': t1,
-                                                                              'set_time_end': t2})
-                logging.info(f"Added video {video_url} from {t1} to {t2}")
-            if (self._db_format_vertical):
-                caption_type = EditingStep.ADD_CAPTION_SHORT_ARABIC if self._db_language == Language.ARABIC.value else EditingStep.ADD_CAPTION_SHORT
-            else:
-                caption_type = EditingStep.ADD_CAPTION_LANDSCAPE_ARABIC if self._db_language == Language.ARABIC.value else EditingStep.ADD_CAPTION_LANDSCAPE
-
-            for (t1, t2), text in self._db_timed_captions:
-                videoEditor.addEditingStep(caption_type, {'text': text.upper(),
-                                                          'set_time_start': t1,
-                                                          'set_time_end': t2})
-
-            logging.info("Rendering video...")
-            videoEditor.renderVideo(outputPath, logger=logging.info)
-            logging.info("Video rendering completed.")
+        logging.info("Rendering short: Starting automated editing...")
+        videoEditor = EditingEngine()
+        videoEditor.addEditingStep(EditingStep.ADD_VOICEOVER_AUDIO, {
+                                   'url': self._db_audio_path})
+        if (self._db_background_music_url):
+            videoEditor.addEditingStep(EditingStep.ADD_BACKGROUND_MUSIC, {'url': self._db_background_music_url,
+                                                                          'loop_background_music': self._db_voiceover_duration,
+                                                                          "volume_percentage": 0.08})
+        for (t1, t2), video_url in self._db_timed_video_urls:
+            videoEditor.addEditingStep(EditingStep.ADD_BACKGROUND_VIDEO, {'url': video_url,
+                                                                          'set_time_start': t1,
+                                                                          'set_time_end': t2})
+            logging.info(f"Added video {video_url} from {t1} to {t2}")
+        if (self._db_format_vertical):
+            caption_type = EditingStep.ADD_CAPTION_SHORT_ARABIC if self._db_language == Language.ARABIC.value else EditingStep.ADD_CAPTION_SHORT
+        else:
+            caption_type = EditingStep.ADD_CAPTION_LANDSCAPE_ARABIC if self._db_language == Language.ARABIC.value else EditingStep.ADD_CAPTION_LANDSCAPE
+
+        for (t1, t2), text in self._db_timed_captions:
+            videoEditor.addEditingStep(caption_type, {'text': text.upper(),
+                                                      'set_time_start': t1,
+                                                      'set_time_end': t2})
+
+        logging.info("Rendering video...")
+        videoEditor.renderVideo(outputPath, logger=logging.info)
+        logging.info("Video rendering completed.")
 
         self._db_video_path = outputPath
 
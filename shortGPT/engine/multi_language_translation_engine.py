@@ -39,16 +39,15 @@ class MultiLanguageTranslationEngine(AbstractContentEngine):
         }
 
     def _transcribe_audio(self):
-        cached_translation = CONTENT_DB.content_collection.find_one({
-        "content_type": 'content_translation',
-        'src_url': self._db_src_url,
-        'ready_to_upload': True
-        })
-        if not (cached_translation and 'speech_blocks' in cached_translation and 'original_language' in cached_translation):
+        cached_translation = CONTENT_DB.find_cached_translation(self._db_src_url)
+        if cached_translation and cached_translation['speech_blocks'] and cached_translation['original_language']:
+            self._db_speech_blocks = cached_translation['speech_blocks']
+            self._db_original_language = cached_translation['original_language']
+        else:
             video_audio, _ = get_asset_duration(self._db_src_url, isVideo=False)
             self.verifyParameters(content_path=video_audio)
             self.logger(f"1/5 - Transcribing original audio to text...")
-            whispered = audioToText(video_audio, model_size='base')
+            whispered = audioToText(video_audio, model_size='base', backend=self.transcriberBackend)
             self._db_speech_blocks = getSpeechBlocks(whispered, silence_time=0.8)
             self._db_original_language = whispered['language']
         
@@ -113,7 +112,7 @@ class MultiLanguageTranslationEngine(AbstractContentEngine):
                     self.logger(f"4.5 / 5 - Generating captions in {target_language.value}")
                     editing_engine.generateAudio(self.dynamicAssetDir+"translated_voiceover.wav")
                     self._db_translated_voiceover_path = self.dynamicAssetDir+"translated_voiceover.wav"
-                whispered_translated = audioToText(self._db_translated_voiceover_path, model_size='base')
+                whispered_translated = audioToText(self._db_translated_voiceover_path, model_size='base', backend=self.transcriberBackend)
                 timed_translated_captions = getCaptionsWithTime(whispered_translated, maxCaptionSize=50 if is_landscape else 15, considerPunctuation=True)
                 self._db_timed_translated_captions = [[[t1,t2], text] for (t1, t2), text in timed_translated_captions if t2 - t1 <= 4]
             for (t1, t2), text in self._db_timed_translated_captions:
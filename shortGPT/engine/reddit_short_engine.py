@@ -70,36 +70,34 @@ class RedditShortEngine(ContentShortEngine):
                               music_url=self._db_background_music_url)
         
         outputPath = self.dynamicAssetDir+"rendered_video.mp4"
-        if not (os.path.exists(outputPath)):
-            self.logger("Rendering short: Starting automated editing...")
-            videoEditor = EditingEngine()
-            videoEditor.addEditingStep(EditingStep.ADD_VOICEOVER_AUDIO, {
-                                       'url': self._db_audio_path})
-            videoEditor.addEditingStep(EditingStep.ADD_BACKGROUND_MUSIC, {'url': self._db_background_music_url,
-                                                                          'loop_background_music': self._db_voiceover_duration,
-                                                                          "volume_percentage": 0.11})
-            videoEditor.addEditingStep(EditingStep.CROP_1920x1080, {
-                                       'url': self._db_background_trimmed})
-            videoEditor.addEditingStep(EditingStep.ADD_SUBSCRIBE_ANIMATION, {'url': AssetDatabase.get_asset_link('subscribe animation')})
+        self.logger("Rendering short: Starting automated editing...")
+        videoEditor = EditingEngine()
+        videoEditor.addEditingStep(EditingStep.ADD_VOICEOVER_AUDIO, {
+                                   'url': self._db_audio_path})
+        videoEditor.addEditingStep(EditingStep.ADD_BACKGROUND_MUSIC, {'url': self._db_background_music_url,
+                                                                      'loop_background_music': self._db_voiceover_duration,
+                                                                      "volume_percentage": 0.11})
+        self._addBackgroundVideo(videoEditor)
+        videoEditor.addEditingStep(EditingStep.ADD_SUBSCRIBE_ANIMATION, {'url': AssetDatabase.get_asset_link('subscribe animation')})
 
-            if self._db_watermark:
-                videoEditor.addEditingStep(EditingStep.ADD_WATERMARK, {
-                                           'text': self._db_watermark})
-            videoEditor.addEditingStep(EditingStep.ADD_REDDIT_IMAGE, {
-                                       'url': self._db_reddit_thread_image})
-            
-            caption_type = EditingStep.ADD_CAPTION_SHORT_ARABIC if self._db_language == Language.ARABIC.value else EditingStep.ADD_CAPTION_SHORT 
-            for timing, text in self._db_timed_captions:
-                videoEditor.addEditingStep(caption_type, {'text': text.upper(),
-                                                                     'set_time_start': timing[0],
-                                                                     'set_time_end': timing[1]})
-            if self._db_num_images:
-                for timing, image_url in self._db_timed_image_urls:
-                    videoEditor.addEditingStep(EditingStep.SHOW_IMAGE, {'url': image_url,
-                                                                        'set_time_start': timing[0],
-                                                                        'set_time_end': timing[1]})
+        if self._db_watermark:
+            videoEditor.addEditingStep(EditingStep.ADD_WATERMARK, {
+                                       'text': self._db_watermark})
+        videoEditor.addEditingStep(EditingStep.ADD_REDDIT_IMAGE, {
+                                   'url': self._db_reddit_thread_image})
+        
+        caption_type = EditingStep.ADD_CAPTION_SHORT_ARABIC if self._db_language == Language.ARABIC.value else EditingStep.ADD_CAPTION_SHORT 
+        for timing, text in self._db_timed_captions:
+            videoEditor.addEditingStep(caption_type, {'text': text.upper(),
+                                                                 'set_time_start': timing[0],
+                                                                 'set_time_end': timing[1]})
+        if self._db_num_images:
+            for timing, image_url in self._db_timed_image_urls:
+                videoEditor.addEditingStep(EditingStep.SHOW_IMAGE, {'url': image_url,
+                                                                    'set_time_start': timing[0],
+                                                                    'set_time_end': timing[1]})
 
-            videoEditor.renderVideo(outputPath, logger= self.logger if self.logger is not self.default_logger else None)
+        videoEditor.renderVideo(outputPath, logger= self.logger if self.logger is not self.default_logger else None)
 
         self._db_video_path = outputPath
 